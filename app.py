@@ -1,9 +1,21 @@
 import streamlit as st
-import tempfile
-import os
-import subprocess
+import time
 from typing import Optional
-from validacao import extract_parameters_from_pdf, validate_parameters, generate_report
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, QueueFullError
+
+POLL_INTERVAL = 1.0  # segundos entre consultas ao status do job
+
+# Fila de jobs compartilhada por todas as sessões do servidor
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    return JobQueue()
+
+# Conexão com o histórico de resultados, também compartilhada; historico (NumPy) e pandas
+# só são importados quando um paciente é informado
+@st.cache_resource
+def get_results_store():
+    from historico import ResultsStore
+    return ResultsStore()
 
 # CSS (inalterado)
 st.markdown("""
@@ -73,9 +85,11 @@ st.divider()
 
 # Informações do Terapeuta (inalterado)
 st.subheader("🧑‍⚕️ Dados do Terapeuta")
-col1, col2 = st.columns(2)
+col1, col2, col3 = st.columns(3)
 therapist_name = col1.text_input("Nome do Terapeuta", placeholder="Ex: Dr. João Silva")
 therapist_registry = col2.text_input("Registro Profissional", placeholder="Ex: CRF-12345")
+patient_name = col3.text_input("Paciente (opcional)", placeholder="Ex: Maria Souza",
+                               help="Todo resultado entra no histórico; com o paciente, também na evolução dele.")
 
 st.divider()
 
@@ -91,53 +105,111 @@ if submit:
     elif not uploaded_file:
         st.warning("⚠️ Selecione um arquivo.")
     else:
-        with st.spinner("🔍 Processando..."):
-            try:
-                # Salva arquivo temporário
-                ext = os.path.splitext(uploaded_file.name)[1].lower()
-                with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-                    tmp.write(uploaded_file.read())
-                    input_path = tmp.name
-
-                # Converte DOCX para PDF se necessário
-                pdf_path = input_path
-                if ext == ".docx":
-                    pdf_path = os.path.join(tempfile.gettempdir(), "converted.pdf")
-                    subprocess.run(["libreoffice", "--headless", "--convert-to", "pdf", input_path, "--outdir", tempfile.gettempdir()], check=True)
-
-                # Extrai e valida
-                parameters = extract_parameters_from_pdf(pdf_path)
-                
-                # Debug: Mostra parâmetros extraídos
-                with st.expander("🛠 Debug: Parâmetros Extraídos (para verificação)"):
-                    if parameters:
-                        st.info(f"📊 {len(parameters)} parâmetros únicos extraídos.")
-                        for name in sorted(parameters.keys()):
-                            data = parameters[name]
-                            st.markdown(f"- **{name}**: Valor {data['valor']:.3f} (Range: {data['min']}–{data['max']})")
-                    else:
-                        st.warning("Nenhum parâmetro extraído. Verifique o PDF.")
-
-                anomalies = validate_parameters(parameters)
-
-                # Feedback
-                if not anomalies:
-                    st.success("🎉 Todos os parâmetros normais!")
-                else:
-                    st.error(f"⚠️ {len(anomalies)} anomalias:")
-                    for a in anomalies:
-                        st.markdown(f"- **{a['item']}**: {a['valor_real']:.3f} ({a['status']}; Normal: {a['normal_min']}–{a['normal_max']})")
-
-                    # Gera e oferece download
-                    output_path = os.path.join(tempfile.gettempdir(), "relatorio_anomalias.docx")
-                    generate_report(anomalies, therapist_name, therapist_registry, output_path)
-                    with open(output_path, "rb") as f:
-                        st.download_button("⬇️ Baixar Relatório", f.read(), file_name="relatorio_anomalias.docx")
-            except Exception as e:
-                st.error(f"Erro: {str(e)}")
-            finally:
-                # Limpeza
-                if os.path.exists(input_path):
-                    os.unlink(input_path)
-                if ext == ".docx" and os.path.exists(pdf_path):
-                    os.unlink(pdf_path)
\ No newline at end of file
+        # Enfileira o processamento; reenvios do mesmo arquivo em andamento reaproveitam o job
+        try:
+            st.session_state.job_id = get_job_queue().submit(
+                uploaded_file.getvalue(), uploaded_file.name, therapist_name, therapist_registry, patient_name.strip()
+            )
+        except QueueFullError as e:
+            st.warning(f"⏳ {e}")
+
+# Acompanhamento do job
+job_id = st.session_state.get("job_id")
+if job_id:
+    job_queue = get_job_queue()
+    status = job_queue.status(job_id)
+    # result()/error() devolvem None se o job foi descartado logo após a consulta do status
+    outcome = job_queue.result(job_id) if status == DONE else job_queue.error(job_id) if status == FAILED else None
+    if status is None or (status in (DONE, FAILED) and outcome is None):  # job descartado (ex.: servidor reiniciado)
+        del st.session_state.job_id
+    elif status in (QUEUED, RUNNING):
+        st.info(f"🔍 Processando... ({status}; {job_queue.pending()} relatório(s) em andamento)")
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
+    elif status == FAILED:
+        st.error(f"Erro: {str(outcome)}")
+    else:
+        result = outcome
+        parameters = result["parametros"]
+        anomalies = result["anomalias"]
+
+        # Debug: Mostra parâmetros extraídos
+        with st.expander("🛠 Debug: Parâmetros Extraídos (para verificação)"):
+            if parameters:
+                st.info(f"📊 {len(parameters)} parâmetros únicos extraídos.")
+                for name in sorted(parameters.keys()):
+                    data = parameters[name]
+                    st.markdown(f"- **{name}**: Valor {data['valor']:.3f} (Range: {data['min']}–{data['max']})")
+            else:
+                st.warning("Nenhum parâmetro extraído. Verifique o PDF.")
+
+            # Tempo por etapa, contadores e pico de memória do processamento
+            report_metrics = result.get("metricas")
+            if report_metrics:
+                st.markdown("**⏱ Métricas do processamento**")
+                st.table([
+                    {"Etapa": name, "Parede (ms)": data["wall_ms"], "CPU (ms)": data["cpu_ms"], "Chamadas": data["chamadas"]}
+                    for name, data in report_metrics["etapas"].items()
+                ])
+                counters = ", ".join(f"{name}: {value}" for name, value in report_metrics["contadores"].items())
+                st.caption(f"{counters} · pico de RSS: {report_metrics['pico_rss_mb']} MB "
+                           f"(processo: {report_metrics.get('pico_rss_processo_mb', '—')} MB)")
+
+        # Feedback
+        if not anomalies:
+            st.success("🎉 Todos os parâmetros normais!")
+        else:
+            st.error(f"⚠️ {len(anomalies)} anomalias:")
+            for a in anomalies:
+                st.markdown(f"- **{a['item']}**: {a['valor_real']:.3f} ({a['status']}; Normal: {a['normal_min']}–{a['normal_max']})")
+
+            # Oferece download do relatório gerado pelo job
+            st.download_button("⬇️ Baixar Relatório", result["relatorio"], file_name="relatorio_anomalias.docx")
+
+# Evolução do paciente ao longo dos relatórios salvos no histórico
+patient = patient_name.strip()
+if patient:
+    import numpy as np
+    import pandas as pd
+    st.divider()
+    st.subheader(f"📈 Evolução de {patient}")
+    history = get_results_store().patient_history(patient)
+    if len(history["relatorios"]) == 0:
+        st.caption("Nenhum relatório salvo para este paciente.")
+    else:
+        dates = pd.to_datetime(history["datas"], unit="s")
+        counts = np.sum(~np.isnan(history["valores"]), axis=0)
+        default = [history["parametros"][i] for i in np.argsort(-counts, kind="stable")[:3]]
+        selected = st.multiselect("Parâmetros", history["parametros"], default=default)
+        if selected:
+            columns = [history["parametros"].index(name) for name in selected]
+            values = history["valores"][:, columns]
+            chart = pd.DataFrame({"Data": np.repeat(dates, len(columns)), "Parâmetro": np.tile(selected, len(dates)),
+                                  "Valor": values.ravel()}).dropna()
+            # Especificação Vega-Lite direta: st.line_chart monta o gráfico pelo Altair a cada reexecução
+            st.vega_lite_chart(chart, {
+                "mark": {"type": "line", "point": True},
+                "encoding": {"x": {"field": "Data", "type": "temporal"},
+                             "y": {"field": "Valor", "type": "quantitative"},
+                             "color": {"field": "Parâmetro", "type": "nominal"}},
+            }, width="stretch")
+        if len(dates) > 1:
+            changes = get_results_store().consecutive_changes(patient)
+            last = changes["variacao"][-1]
+            relative = changes["variacao_relativa"][-1]
+            st.markdown("**Variação em relação ao relatório anterior**")
+            st.table([
+                {"Parâmetro": history["parametros"][i], "Variação": f"{last[i]:+.3f}",
+                 "Variação (%)": f"{relative[i]:+.1%}" if np.isfinite(relative[i]) else "—"}
+                for i in np.argsort(-np.nan_to_num(np.abs(relative), nan=-1.0))[:10] if not np.isnan(last[i])
+            ])
+
+    with st.expander("🏥 Parâmetros mais frequentemente fora do intervalo (todos os pacientes)"):
+        frequency = get_results_store().out_of_range_frequency()
+        if frequency["parametros"]:
+            chart = pd.DataFrame({"Parâmetro": frequency["parametros"][:15], "Fora do intervalo": frequency["frequencia"][:15]})
+            st.vega_lite_chart(chart, {
+                "mark": "bar",
+                "encoding": {"x": {"field": "Fora do intervalo", "type": "quantitative", "axis": {"format": "%"}},
+                             "y": {"field": "Parâmetro", "type": "nominal", "sort": "-x"}},
+            }, width="stretch")
@@ -0,0 +1,222 @@
+"""Processamento em lote de relatórios MTC, sem a interface Streamlit.
+
+Uso:
+    python batch.py relatorios/ --saida resultados.jsonl [--csv resultados.csv]
+    python batch.py "relatorios/**/*.docx" --workers 8 --docx anomalias/ --terapeuta "Dr. João" --registro CRF-123
+    python batch.py relatorios/ --saida resultados.jsonl --retomar
+
+Cada arquivo é processado num processo separado (extração, validação e, se pedido,
+o DOCX de anomalias); o resultado é gravado no JSONL/CSV assim que o arquivo termina.
+Erros ficam isolados no registro do próprio arquivo e não interrompem o lote, inclusive
+quando o processo do arquivo morre (falta de memória, falha no pdfminer/tesseract).
+Os DOCX de anomalias repetem, dentro de --docx, os subdiretórios da entrada. Os
+resultados também são gravados no histórico (historico.py), sem paciente.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+import metrics
+from cache import file_sha256
+from historico import record_report
+from validacao import extract_parameters, generate_report, validate_parameters
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+CSV_FIELDS = ["arquivo", "item", "min", "max", "valor", "status", "erro"]
+
+
+def find_reports(entrada: str, exclude: Sequence[str] = ()) -> List[str]:
+    if os.path.isdir(entrada):
+        paths = glob.glob(os.path.join(entrada, "**", "*"), recursive=True)
+    else:
+        paths = glob.glob(entrada, recursive=True)
+    # Saídas da própria execução (diretório --docx, --saida, --csv) nunca são entrada,
+    # mesmo quando ficam dentro do diretório varrido
+    excluded = [os.path.abspath(p) for p in exclude if p]
+    return sorted(
+        p for p in paths
+        if os.path.isfile(p) and p.lower().endswith(SUPPORTED_EXTENSIONS)
+        and not any(os.path.abspath(p) == e or os.path.abspath(p).startswith(e + os.sep) for e in excluded)
+    )
+
+
+# Arquivos já concluídos com sucesso numa execução anterior (lidos do JSONL de saída)
+def completed_files(jsonl_path: str) -> Set[str]:
+    done = set()
+    if not os.path.exists(jsonl_path):
+        return done
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:  # linha truncada por uma execução interrompida
+                continue
+            if record.get("status") == "ok":
+                done.add(record["arquivo"])
+    return done
+
+
+# Caminho do DOCX de anomalias de cada arquivo: o caminho relativo à raiz comum da entrada,
+# para que relatorios/a/rel.pdf e relatorios/b/rel.pdf não gravem o mesmo arquivo; a
+# extensão entra no nome só quando rel.pdf e rel.docx estão no mesmo diretório
+def report_paths(paths: List[str], docx_dir: str) -> Dict[str, str]:
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    stems = {p: os.path.splitext(os.path.relpath(os.path.abspath(p), root))[0] for p in paths}
+    repeated = {stem for stem, count in Counter(stems.values()).items() if count > 1}
+    names = {}
+    for path, stem in stems.items():
+        if stem in repeated:
+            stem += "_" + os.path.splitext(path)[1].lstrip(".").lower()
+        names[path] = os.path.join(docx_dir, stem + "_anomalias.docx")
+    return names
+
+
+def _error_record(path: str, error: BaseException, seconds: float) -> Dict[str, Any]:
+    return {"arquivo": path, "status": "erro", "erro": f"{type(error).__name__}: {error}", "segundos": round(seconds, 3)}
+
+
+def process_file(path: str, report_path: Optional[str], therapist: str, registry: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        with metrics.collect(path, origem="lote"):
+            # Um processo por arquivo: o OCR de cada arquivo roda em série para não sobrecarregar a CPU
+            with metrics.stage("extracao"):
+                parameters = extract_parameters(path, ocr_workers=1)
+            with metrics.stage("validacao"):
+                anomalies = validate_parameters(parameters)
+            with metrics.stage("historico"):  # sem paciente: entra só nas estatísticas da clínica
+                record_report(None, parameters, anomalies, file_sha256(path), therapist, registry, path)
+            if not anomalies:
+                report_path = None
+            elif report_path:
+                os.makedirs(os.path.dirname(report_path), exist_ok=True)
+                with metrics.stage("relatorio"):
+                    generate_report(anomalies, therapist, registry, report_path)
+        return {
+            "arquivo": path,
+            "status": "ok",
+            "parametros": parameters,
+            "anomalias": anomalies,
+            "relatorio": report_path,
+            "segundos": round(time.perf_counter() - start, 3),
+        }
+    except Exception as e:
+        return _error_record(path, e, time.perf_counter() - start)
+
+
+# Reprocessa um arquivo sozinho num pool próprio; se o processo morrer de novo, o erro é dele
+def _process_isolated(path: str, args: tuple) -> Dict[str, Any]:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(process_file, path, *args).result()
+        except BrokenProcessPool as e:
+            return _error_record(path, e, time.perf_counter() - start)
+
+
+# Processa os arquivos com no máximo `workers` em andamento. Se um processo morre, o pool
+# quebra e todos os arquivos em andamento falham juntos: cada um deles é reprocessado
+# isolado (só o culpado fica com erro) e o restante do lote segue num pool novo.
+def process_all(paths: List[str], workers: int, args_for) -> Iterator[Dict[str, Any]]:
+    queue = list(reversed(paths))
+    while queue:
+        suspects: List[str] = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while (queue or running) and not suspects:
+                while queue and len(running) < workers:
+                    path = queue.pop()
+                    running[pool.submit(process_file, path, *args_for(path))] = path
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = running.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        suspects.append(path)
+            suspects.extend(running.values())
+        for path in suspects:
+            yield _process_isolated(path, args_for(path))
+
+
+def csv_rows(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if record["status"] != "ok":
+        return [{"arquivo": record["arquivo"], "erro": record["erro"]}]
+    status = {a["item"]: a["status"] for a in record["anomalias"]}
+    return [
+        {"arquivo": record["arquivo"], "item": name, "min": data["min"], "max": data["max"],
+         "valor": data["valor"], "status": status.get(name, "Normal")}
+        for name, data in record["parametros"].items()
+    ]
+
+
+def run(args: argparse.Namespace) -> int:
+    paths = find_reports(args.entrada, exclude=(args.docx, args.saida, args.csv))
+    # Nomes calculados sobre todos os arquivos, para que --retomar mantenha os mesmos
+    reports = report_paths(paths, args.docx) if args.docx and paths else {}
+    if args.retomar:
+        done = completed_files(args.saida)
+        paths = [p for p in paths if p not in done]
+    if not paths:
+        print("Nenhum arquivo a processar.")
+        return 0
+
+    mode = "a" if args.retomar else "w"
+    csv_file = None
+    writer = None
+    if args.csv:
+        write_header = not (args.retomar and os.path.exists(args.csv) and os.path.getsize(args.csv) > 0)
+        csv_file = open(args.csv, mode, newline="", encoding="utf-8")
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        if write_header:
+            writer.writeheader()
+
+    errors = 0
+    start = time.perf_counter()
+    try:
+        with open(args.saida, mode, encoding="utf-8") as jsonl:
+            records = process_all(paths, args.workers, lambda p: (reports.get(p), args.terapeuta, args.registro))
+            for done_count, record in enumerate(records, start=1):
+                jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+                jsonl.flush()
+                if writer:
+                    writer.writerows(csv_rows(record))
+                    csv_file.flush()
+                if record["status"] != "ok":
+                    errors += 1
+                    print(f"[{done_count}/{len(paths)}] ❌ {record['arquivo']}: {record['erro']}", file=sys.stderr)
+                else:
+                    print(f"[{done_count}/{len(paths)}] {record['arquivo']}: "
+                          f"{len(record['parametros'])} parâmetros, {len(record['anomalias'])} anomalias")
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Concluído: {len(paths)} arquivos em {elapsed:.1f}s ({len(paths) / elapsed:.2f} arquivos/s), {errors} com erro.")
+    return 1 if errors else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validação em lote de relatórios MTC")
+    parser.add_argument("entrada", help="Diretório (busca recursiva) ou padrão glob dos relatórios")
+    parser.add_argument("--saida", default="resultados.jsonl", help="Arquivo JSONL de resultados (um registro por arquivo)")
+    parser.add_argument("--csv", help="Arquivo CSV opcional (uma linha por parâmetro)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos em paralelo")
+    parser.add_argument("--retomar", action="store_true", help="Pula arquivos já concluídos no JSONL de saída")
+    parser.add_argument("--docx", metavar="DIR", help="Gera o relatório de anomalias (.docx) de cada arquivo neste diretório")
+    parser.add_argument("--terapeuta", default="", help="Nome do terapeuta nos relatórios DOCX")
+    parser.add_argument("--registro", default="", help="Registro profissional nos relatórios DOCX")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+"""Micro-benchmarks do pipeline de validação.
+
+Uso:
+    python benchmark.py nomes [--linhas 20000]
+    python benchmark.py dedup [--relatorios 3] [--parametros 250]
+    python benchmark.py ocr relatorio.pdf [--dpi 200] [--workers N]
+    python benchmark.py cache relatorio.pdf
+    python benchmark.py docx relatorio.docx [--repeticoes 5]
+    python benchmark.py layout [--relatorios 10] [--parametros 150] [--quebra 0.3]
+    python benchmark.py suite [--relatorios 10] [--paginas 5] [--parametros 150] [--quebra 0.2]
+                              [--paginas-ocr 0] [--formatos pdf docx] [--salvar-baseline base.json]
+                              [--baseline base.json --limite 0.2 --limite-memoria 0.1]
+    python benchmark.py historico [--relatorios 20000] [--pacientes 2000] [--parametros 100]
+    python benchmark.py inicio [--repeticoes 5]
+
+A suíte gera relatórios sintéticos (sintetico.py), mede extract_parameters,
+validate_parameters e generate_report de ponta a ponta e por etapa (metrics.py),
+e com --baseline falha (código 1) se tempo, vazão ou memória piorarem mais que --limite
+(ou --limite-memoria, para o pico de RSS), ou se o recall cair.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import time
+from io import BytesIO
+from typing import Optional
+
+import validacao
+
+# Palavras soltas para montar linhas que não correspondem a nenhum termo
+NOISE_WORDS = [
+    "resultado", "paciente", "exame", "referência", "análise", "medição", "período",
+    "observação", "quantidade", "padrão", "relatório", "figura", "amostra", "teste",
+]
+
+
+# Implementação original de is_valid_name (varredura linear), mantida só para comparação
+def _legacy_is_valid_name(name: str) -> bool:
+    name_lower = name.lower()
+    invalid_starts = list(validacao.INVALID_STARTS)
+    invalid_ends = list(validacao.INVALID_ENDS)
+    if name_lower.startswith(tuple(invalid_starts)) or name_lower.endswith(tuple(invalid_ends)):
+        return False
+    char_count = len(re.sub(r'[^a-zA-Z]', '', name))
+    word_count = len(name.split())
+    if char_count < 10 or char_count > 80 or word_count > 10:
+        return False
+    valid_terms = list(validacao.VALID_TERMS)
+    return any(term in name_lower for term in valid_terms)
+
+
+# Deduplicação original (comparação de cada nome com todas as chaves), mantida só para comparação
+def _legacy_dedup(rows) -> dict:
+    parameters = {}
+    seen = set()
+    for name, min_val, max_val, val in rows:
+        norm_name = validacao.normalize_name(name)
+        for existing in list(parameters.keys()):
+            if validacao.names_are_similar(name, existing):
+                if len(name) > len(existing):
+                    del parameters[existing]
+                    seen.remove(validacao.normalize_name(existing))
+                else:
+                    name = existing
+                break
+        if norm_name in seen:
+            continue
+        seen.add(norm_name)
+        if min_val < max_val:
+            parameters[name] = {"min": min_val, "max": max_val, "valor": val}
+    return parameters
+
+
+def _indexed_dedup(rows) -> dict:
+    index = validacao.ParameterIndex()
+    for row in rows:
+        index.add(*row)
+    return index.parameters
+
+
+# Variações de um nome como aparecem nos relatórios: caixa, parênteses, quebras e cortes
+def _name_variant(rng: random.Random, term: str) -> str:
+    choice = rng.random()
+    if choice < 0.2:
+        return term.title()
+    if choice < 0.35:
+        return term.replace("(", "").replace(")", "")
+    if choice < 0.5:
+        return "Nível de " + term
+    if choice < 0.6 and " " in term:
+        return term.split(" ", 1)[1]
+    if choice < 0.7:
+        return term + " do paciente"
+    return term
+
+
+def _synthetic_rows(count: int, rng: random.Random) -> list:
+    population = sorted({t for t in validacao.VALID_TERMS if len(t) >= 10})
+    terms = rng.sample(population, min(count, len(population)))
+    rows = []
+    for term in terms:
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            low = round(rng.uniform(0.1, 50), 3)
+            high = round(low + rng.uniform(-1, 30), 3)
+            rows.append((_name_variant(rng, term), low, high, round(rng.uniform(0, 80), 3)))
+    rng.shuffle(rows)
+    return rows
+
+
+def _synthetic_lines(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        words = rng.sample(NOISE_WORDS, rng.randint(2, 6))
+        if rng.random() < 0.5:
+            term = rng.choice(validacao.VALID_TERMS)
+            words.insert(rng.randint(0, len(words)), term.title() if rng.random() < 0.5 else term)
+        lines.append(" ".join(words))
+    return lines
+
+
+def _lines_per_second(func, lines) -> float:
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def bench_nomes(args) -> None:
+    lines = _synthetic_lines(args.linhas)
+    divergent = [line for line in lines if _legacy_is_valid_name(line) != validacao.is_valid_name(line)]
+    if divergent:
+        raise SystemExit(f"❌ {len(divergent)} linhas com resultado diferente, ex.: {divergent[0]!r}")
+
+    before = _lines_per_second(_legacy_is_valid_name, lines)
+    after = _lines_per_second(validacao.is_valid_name, lines)
+    print(f"is_valid_name: {len(lines)} linhas, resultados idênticos")
+    print(f"  antes (varredura linear): {before:12,.0f} linhas/s")
+    print(f"  depois (trie compilada):  {after:12,.0f} linhas/s  ({after / before:.1f}x)")
+
+
+def bench_dedup(args) -> None:
+    rng = random.Random(7)
+    reports = [_synthetic_rows(args.parametros, rng) for _ in range(args.relatorios)]
+    for rows in reports:
+        legacy, indexed = _legacy_dedup(rows), _indexed_dedup(rows)
+        if list(legacy.items()) != list(indexed.items()):
+            raise SystemExit("❌ Deduplicação indexada divergiu da original")
+
+    timings = {}
+    for label, func in (("antes (O(n²) SequenceMatcher)", _legacy_dedup), ("depois (índice)", _indexed_dedup)):
+        start = time.perf_counter()
+        for rows in reports:
+            func(rows)
+        timings[label] = (time.perf_counter() - start) / len(reports)
+    total_rows = sum(len(rows) for rows in reports) // len(reports)
+    print(f"Deduplicação: {args.relatorios} relatórios de ~{total_rows} linhas, saídas idênticas (inclusive ordem)")
+    for label, seconds in timings.items():
+        print(f"  {label:32} {seconds * 1000:9.1f} ms/relatório")
+
+
+# Caminho de OCR original: uma chamada ao pdf2image e um Tesseract por página, em série
+def _legacy_ocr(pdf_path: str, page_numbers: list) -> dict:
+    from pdf2image import convert_from_path
+    texts = {}
+    for number in page_numbers:
+        images = convert_from_path(pdf_path, first_page=number, last_page=number)
+        if images:
+            texts[number] = validacao.ocr_page(images[0])
+    return texts
+
+
+def bench_ocr(args) -> None:
+    import pdfplumber
+    with pdfplumber.open(args.pdf) as pdf:
+        page_numbers = [page.page_number for page in pdf.pages if not page.extract_text()]
+    if not page_numbers:
+        raise SystemExit("O PDF não tem páginas sem texto nativo; nada a comparar.")
+
+    start = time.perf_counter()
+    _legacy_ocr(args.pdf, page_numbers)
+    before = len(page_numbers) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    validacao.ocr_pages(args.pdf, page_numbers, dpi=args.dpi, workers=args.workers)
+    after = len(page_numbers) / (time.perf_counter() - start)
+    workers = args.workers or validacao.OCR_WORKERS
+    print(f"OCR: {len(page_numbers)} páginas sem texto nativo")
+    print(f"  antes (serial, página a página): {before:8.2f} páginas/s")
+    print(f"  depois (lote, {workers} processos):    {after:8.2f} páginas/s  ({after / before:.1f}x)")
+
+
+def bench_cache(args) -> None:
+    import tempfile
+    from cache import ExtractionCache, file_sha256
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        extraction_cache = ExtractionCache(os.path.join(tmpdir, "cache.db"))
+        key = validacao._cache_key(args.pdf, f"dpi={validacao.OCR_DPI}")
+        start = time.perf_counter()
+        parameters = validacao._extract_parameters_from_pdf(args.pdf, None, None)
+        extraction_cache.put(key, parameters)
+        miss = time.perf_counter() - start
+        start = time.perf_counter()
+        file_sha256(args.pdf)
+        cached = extraction_cache.get(key)
+        hit = time.perf_counter() - start
+    assert cached == parameters
+    print(f"Cache de extração: {len(parameters)} parâmetros")
+    print(f"  miss (extração completa): {miss * 1000:9.1f} ms")
+    print(f"  hit (hash + SQLite):      {hit * 1000:9.1f} ms")
+
+
+def bench_docx(args) -> None:
+    import shutil
+    import tempfile
+    from converter import SOFFICE, LibreOfficeConverter
+
+    start = time.perf_counter()
+    for _ in range(args.repeticoes):
+        native = validacao._extract_parameters_from_docx(args.docx)
+    native_ms = (time.perf_counter() - start) / args.repeticoes * 1000
+    print(f"DOCX: {len(native)} parâmetros pela leitura nativa")
+    print(f"  leitura nativa (python-docx):     {native_ms:9.1f} ms/arquivo")
+
+    if not shutil.which(SOFFICE):
+        print(f"  conversão LibreOffice: '{SOFFICE}' não encontrado, comparação não executada")
+        return
+    converter = LibreOfficeConverter()
+    try:
+        timings = []
+        for _ in range(args.repeticoes):
+            with tempfile.TemporaryDirectory() as output_dir:
+                start = time.perf_counter()
+                validacao._extract_parameters_from_pdf(converter.convert(args.docx, output_dir), None, None)
+                timings.append(time.perf_counter() - start)
+    finally:
+        converter.shutdown()
+    print(f"  LibreOffice -> PDF (1ª chamada):  {timings[0] * 1000:9.1f} ms/arquivo")
+    if len(timings) > 1:
+        print(f"  LibreOffice -> PDF (demais):      {sum(timings[1:]) / (len(timings) - 1) * 1000:9.1f} ms/arquivo")
+
+
+# Parser de linhas sobre o texto corrido de cada página (caminho anterior à extração por layout)
+def _line_parser_extract(pdf_path: str) -> dict:
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return validacao.parse_texts([page.extract_text() for page in pdf.pages])
+
+
+def _accuracy(expected: dict, extracted: dict) -> tuple:
+    expected_by_norm = {validacao.normalize_name(name): data for name, data in expected.items()}
+    correct = sum(1 for name, data in extracted.items() if expected_by_norm.get(validacao.normalize_name(name)) == data)
+    return correct, len(extracted), len(expected)
+
+
+def bench_layout(args) -> None:
+    import tempfile
+    import pdfplumber
+    import sintetico
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reports = []
+        for seed in range(args.relatorios):
+            path = os.path.join(tmpdir, f"relatorio_{seed}.pdf")
+            reports.append((path, sintetico.generate_pdf(path, args.parametros, args.quebra, seed=seed)))
+        pages = 0
+        for path, _ in reports:
+            with pdfplumber.open(path) as pdf:
+                pages += len(pdf.pages)
+
+        print(f"Layout x parser de linhas: {args.relatorios} relatórios sintéticos, {pages} páginas, "
+              f"{args.quebra:.0%} dos nomes quebrados")
+        for label, func in (("parser de linhas", _line_parser_extract),
+                            ("layout (coordenadas)", lambda p: validacao._extract_parameters_from_pdf(p, None, None))):
+            correct = extracted = expected = 0
+            start = time.perf_counter()
+            for path, truth in reports:
+                c, e, t = _accuracy(truth, func(path))
+                correct, extracted, expected = correct + c, extracted + e, expected + t
+            elapsed = time.perf_counter() - start
+            print(f"  {label:22} precisão {correct / max(extracted, 1):6.1%}  recall {correct / expected:6.1%}  "
+                  f"{pages / elapsed:7.1f} páginas/s")
+
+
+# Etapas com menos que isso (ms/relatório) na baseline ficam fora da checagem de regressão (ruído)
+MIN_STAGE_MS = 5.0
+
+
+def _generate_suite(args, tmpdir: str) -> list:
+    import sintetico
+    reports = []
+    for seed in range(args.relatorios):
+        for fmt in args.formatos:
+            path = os.path.join(tmpdir, f"relatorio_{seed}.{fmt}")
+            if fmt == "pdf":
+                truth = sintetico.generate_pdf(path, args.parametros, args.quebra, args.paginas, args.paginas_ocr, seed=seed)
+            else:
+                truth = sintetico.generate_docx(path, args.parametros, args.quebra, seed=seed)
+            reports.append((fmt, path, truth))
+    return reports
+
+
+def _run_report(path: str, ocr_workers) -> tuple:
+    import metrics
+    with metrics.collect(os.path.basename(path), write=False) as collector:
+        with metrics.stage("extracao"):
+            parameters = validacao.extract_parameters(path, use_cache=False, ocr_workers=ocr_workers)
+        with metrics.stage("validacao"):
+            anomalies = validacao.validate_parameters(parameters)
+        with metrics.stage("relatorio"):
+            validacao.generate_report(anomalies, "Benchmark", "0000", BytesIO())
+    return parameters, collector.summary()
+
+
+def _measure(reports: list, fmt: str, ocr_workers) -> dict:
+    selected = [(path, truth) for f, path, truth in reports if f == fmt]
+    _run_report(selected[0][0], ocr_workers)  # aquecimento: imports e caches de primeira execução
+    stages, pages, correct, expected = {}, 0, 0, 0
+    peak_rss = 0.0
+    start = time.perf_counter()
+    for path, truth in selected:
+        parameters, summary = _run_report(path, ocr_workers)
+        for name, data in summary["etapas"].items():
+            stages[name] = stages.get(name, 0.0) + data["wall_ms"]
+        pages += summary["contadores"].get("paginas", 0)
+        peak_rss = max(peak_rss, summary["pico_rss_mb"])
+        c, _, t = _accuracy(truth, parameters)
+        correct, expected = correct + c, expected + t
+    elapsed = time.perf_counter() - start
+    return {
+        "relatorios": len(selected),
+        "ms_por_relatorio": round(elapsed / len(selected) * 1000, 3),
+        "relatorios_por_s": round(len(selected) / elapsed, 3),
+        "paginas_por_s": round(pages / elapsed, 3) if pages else None,
+        "etapas_ms": {name: round(total / len(selected), 3) for name, total in sorted(stages.items())},
+        "recall": round(correct / max(expected, 1), 4),
+        "pico_rss_mb": peak_rss,
+    }
+
+
+def _print_results(results: dict) -> None:
+    for fmt, result in results.items():
+        pages = f", {result['paginas_por_s']:.1f} páginas/s" if result["paginas_por_s"] else ""
+        print(f"[{fmt}] {result['relatorios']} relatórios: {result['ms_por_relatorio']:.1f} ms/relatório, "
+              f"{result['relatorios_por_s']:.2f} relatórios/s{pages}, recall {result['recall']:.1%}, "
+              f"pico de RSS {result['pico_rss_mb']:.0f} MB")
+        for name, ms in result["etapas_ms"].items():
+            print(f"    {name:16} {ms:10.2f} ms/relatório")
+
+
+# Compara com a baseline salva; devolve as regressões acima do limite: tempo total e por
+# etapa, vazão (relatórios/s e páginas/s), pico de RSS (com memory_limit) e recall
+def _regressions(baseline: dict, results: dict, limit: float, memory_limit: Optional[float] = None) -> list:
+    memory_limit = limit if memory_limit is None else memory_limit
+    found = []
+    for fmt, old in baseline["resultados"].items():
+        new = results.get(fmt)
+        if new is None:
+            continue
+        checks = [("ms_por_relatorio", old["ms_por_relatorio"], new["ms_por_relatorio"])]
+        checks += [(f"etapa {name}", ms, new["etapas_ms"].get(name, 0.0))
+                   for name, ms in old["etapas_ms"].items() if ms >= MIN_STAGE_MS]
+        for label, before, after in checks:
+            if before and after > before * (1 + limit):
+                found.append(f"[{fmt}] {label}: {before:.2f} -> {after:.2f} ms (+{after / before - 1:.0%})")
+        for key in ("relatorios_por_s", "paginas_por_s"):
+            before, after = old.get(key), new.get(key)
+            if before and (after or 0.0) < before / (1 + limit):
+                found.append(f"[{fmt}] {key}: {before:.2f} -> {after or 0.0:.2f} ({(after or 0.0) / before - 1:.0%})")
+        before, after = old.get("pico_rss_mb"), new["pico_rss_mb"]
+        if before and after > before * (1 + memory_limit):
+            found.append(f"[{fmt}] pico_rss_mb: {before:.0f} -> {after:.0f} MB (+{after / before - 1:.0%})")
+        if new["recall"] < old["recall"]:
+            found.append(f"[{fmt}] recall: {old['recall']:.1%} -> {new['recall']:.1%}")
+    return found
+
+
+def bench_suite(args) -> None:
+    import tempfile
+    import metrics
+
+    if args.paginas_ocr and "pdf" in args.formatos and not (shutil.which("pdftoppm") and shutil.which("tesseract")):
+        raise SystemExit("--paginas-ocr exige poppler (pdftoppm) e tesseract instalados.")
+    metrics.ENABLED = True
+    config = {key: getattr(args, key) for key in ("relatorios", "paginas", "parametros", "quebra", "paginas_ocr", "formatos")}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reports = _generate_suite(args, tmpdir)
+        results = {fmt: _measure(reports, fmt, args.ocr_workers) for fmt in args.formatos}
+    _print_results(results)
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "resultados": results}, f, ensure_ascii=False, indent=2)
+        print(f"Baseline salva em {args.salvar_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["config"] != config:
+            print(f"⚠️ Configuração diferente da baseline: {baseline['config']}", file=sys.stderr)
+        regressions = _regressions(baseline, results, args.limite, args.limite_memoria)
+        if regressions:
+            print(f"❌ Regressões acima de {args.limite:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ Sem regressões acima de {args.limite:.0%} em relação a {args.baseline}")
+
+
+def _median_ms(func, args_list: list) -> float:
+    times = []
+    for item in args_list:
+        start = time.perf_counter()
+        func(item)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def bench_historico(args) -> None:
+    import sqlite3
+    import tempfile
+    import sintetico
+    from historico import ResultsStore
+
+    rng = random.Random(42)
+    names = sintetico.vocabulary()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = ResultsStore(os.path.join(tmpdir, "historico.db"))
+        base = time.time() - args.relatorios * 3600
+        start = time.perf_counter()
+        for number in range(args.relatorios):
+            parameters = {}
+            for name in rng.sample(names, min(args.parametros, len(names))):
+                low = round(rng.uniform(0.1, 60), 3)
+                parameters[name] = {"min": low, "max": low + 10, "valor": round(rng.uniform(low - 3, low + 13), 3)}
+            anomalies = validacao.validate_parameters(parameters)
+            store.save_report(f"Paciente {rng.randrange(args.pacientes)}", parameters, anomalies,
+                              f"{number:064x}", created=base + number * 3600)
+        elapsed = time.perf_counter() - start
+        rows = store._conn.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+        print(f"Histórico: {args.relatorios} relatórios, {rows} resultados, {args.pacientes} pacientes")
+        print(f"  gravação (1 transação por relatório): {args.relatorios / elapsed:10.0f} relatórios/s")
+
+        patients = [f"Paciente {rng.randrange(args.pacientes)}" for _ in range(50)]
+        history = _median_ms(store.patient_history, patients)
+        changes = _median_ms(store.consecutive_changes, patients)
+        frequency = _median_ms(lambda _: store.out_of_range_frequency(), range(20))
+        # Referência: a mesma frequência agregando todos os resultados a cada consulta
+        conn = sqlite3.connect(store.path)
+        scan = _median_ms(lambda _: conn.execute(
+            "SELECT parametro_id, COUNT(*), SUM(status != 0) FROM resultados GROUP BY parametro_id").fetchall(), range(3))
+        conn.close()
+    print(f"  histórico de um paciente (mediana):   {history:10.2f} ms")
+    print(f"  variação entre relatórios (mediana):  {changes:10.2f} ms")
+    print(f"  frequência fora do intervalo:         {frequency:10.2f} ms  (varredura de resultados: {scan:.1f} ms)")
+
+
+# Importação a frio, num interpretador novo: segundos e módulos pesados carregados
+_COLD_IMPORT = """
+import sys, time
+start = time.perf_counter()
+import jobs
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("pdfplumber", "pytesseract", "pdf2image", "PIL", "docx", "pandas", "numpy") if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+# Execução do app.py pelo AppTest do Streamlit: primeira execução e reexecuções após
+# digitar nos campos do terapeuta (sem e com paciente preenchido)
+_APP_RUNS = """
+import json, statistics, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=60)
+at.session_state["authenticated"] = True
+start = time.perf_counter()
+at.run()
+first = time.perf_counter() - start
+
+def reruns(count):
+    times = []
+    for i in range(count):
+        start = time.perf_counter()
+        at.text_input[0].input("Dr. Teste" + "x" * i).run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+warm = reruns(%(repeticoes)d)
+at.text_input[2].input("Paciente 1").run()
+warm_patient = reruns(%(repeticoes)d)
+print(json.dumps([first, warm, warm_patient]))
+"""
+
+
+def bench_inicio(args) -> None:
+    import statistics
+    import subprocess
+    import tempfile
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    cold, heavy = [], ""
+    for _ in range(args.repeticoes):
+        out = subprocess.run([sys.executable, "-c", _COLD_IMPORT], cwd=root, capture_output=True, text=True, check=True)
+        seconds, heavy = out.stdout.split()[0], (out.stdout.split() + [""])[1]
+        cold.append(float(seconds))
+    print(f"Importação a frio (jobs + validacao), mediana de {args.repeticoes}: {statistics.median(cold) * 1000:8.1f} ms")
+    print(f"  módulos pesados carregados: {heavy or 'nenhum'}")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        from historico import ResultsStore
+        db = os.path.join(tmpdir, "historico.db")
+        store = ResultsStore(db)
+        for number in range(20):
+            store.save_report("Paciente 1", {"Colesterol total": {"min": 1.0, "max": 2.0, "valor": 1 + number / 10}},
+                              [], f"{number:064x}", created=1e9 + number * 86400)
+        env = dict(os.environ, MTC_RESULTS_DB=db)
+        out = subprocess.run([sys.executable, "-c", _APP_RUNS % {"repeticoes": args.repeticoes}], cwd=root, env=env,
+                             capture_output=True, text=True, check=True)
+    first, warm, warm_patient = json.loads(out.stdout.strip().splitlines()[-1])
+    print(f"app.py (AppTest): primeira execução {first * 1000:8.1f} ms")
+    print(f"  reexecução ao digitar (mediana):               {warm * 1000:8.1f} ms")
+    print(f"  reexecução ao digitar, com paciente (mediana): {warm_patient * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks do MTC Insight")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    nomes = sub.add_parser("nomes", help="is_valid_name: linhas/s antes e depois")
+    nomes.add_argument("--linhas", type=int, default=20000)
+    nomes.set_defaults(func=bench_nomes)
+
+    dedup = sub.add_parser("dedup", help="Deduplicação de parâmetros: tempo por relatório antes e depois")
+    dedup.add_argument("--relatorios", type=int, default=3)
+    dedup.add_argument("--parametros", type=int, default=250)
+    dedup.set_defaults(func=bench_dedup)
+
+    ocr = sub.add_parser("ocr", help="OCR das páginas escaneadas: páginas/s serial x em lote")
+    ocr.add_argument("pdf")
+    ocr.add_argument("--dpi", type=int, default=None)
+    ocr.add_argument("--workers", type=int, default=None)
+    ocr.set_defaults(func=bench_ocr)
+
+    cache = sub.add_parser("cache", help="Cache de extração: tempo de miss x hit")
+    cache.add_argument("pdf")
+    cache.set_defaults(func=bench_cache)
+
+    docx = sub.add_parser("docx", help="DOCX: leitura nativa x conversão pelo LibreOffice")
+    docx.add_argument("docx")
+    docx.add_argument("--repeticoes", type=int, default=5)
+    docx.set_defaults(func=bench_docx)
+
+    layout = sub.add_parser("layout", help="Extração por layout x parser de linhas: precisão, recall e páginas/s")
+    layout.add_argument("--relatorios", type=int, default=10)
+    layout.add_argument("--parametros", type=int, default=150)
+    layout.add_argument("--quebra", type=float, default=0.3)
+    layout.set_defaults(func=bench_layout)
+
+    suite = sub.add_parser("suite", help="Suíte de ponta a ponta com relatórios sintéticos e comparação com baseline")
+    suite.add_argument("--relatorios", type=int, default=10)
+    suite.add_argument("--paginas", type=int, default=5, help="Páginas por PDF (0 = quantas forem necessárias)")
+    suite.add_argument("--parametros", type=int, default=150)
+    suite.add_argument("--quebra", type=float, default=0.2, help="Fração dos nomes quebrados em duas linhas")
+    suite.add_argument("--paginas-ocr", type=int, default=0, help="Páginas só com imagem (OCR) por PDF")
+    suite.add_argument("--ocr-workers", type=int, default=None)
+    suite.add_argument("--formatos", nargs="+", choices=("pdf", "docx"), default=["pdf", "docx"])
+    suite.add_argument("--salvar-baseline", metavar="ARQUIVO")
+    suite.add_argument("--baseline", metavar="ARQUIVO")
+    suite.add_argument("--limite", type=float, default=0.2, help="Piora relativa tolerada (0.2 = 20%%)")
+    suite.add_argument("--limite-memoria", type=float, default=None,
+                       help="Aumento relativo tolerado do pico de RSS (padrão: o mesmo de --limite)")
+    suite.set_defaults(func=bench_suite)
+
+    historico = sub.add_parser("historico", help="Histórico de resultados: gravação e latência das consultas")
+    historico.add_argument("--relatorios", type=int, default=20000)
+    historico.add_argument("--pacientes", type=int, default=2000)
+    historico.add_argument("--parametros", type=int, default=100)
+    historico.set_defaults(func=bench_historico)
+
+    inicio = sub.add_parser("inicio", help="Streamlit: importação a frio e reexecução do app.py a quente")
+    inicio.add_argument("--repeticoes", type=int, default=5)
+    inicio.set_defaults(func=bench_inicio)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Cache de extrações endereçado pelo conteúdo: a chave é o SHA-256 dos bytes do
+# arquivo mais a versão do parser (e, nos PDFs, o DPI do OCR), então reenvios do
+# mesmo relatório não passam de novo pelo pdfplumber/OCR. Fica num banco irmão de
+# dados_relatorio.db, em modo WAL para que as sessões simultâneas do Streamlit leiam
+# e gravem sem se bloquear.
+CACHE_PATH = os.environ.get(
+    "MTC_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_extracao.db")
+)
+CACHE_MAX_ENTRIES = int(os.environ.get("MTC_CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.environ.get("MTC_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extracoes (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL,
+    tamanho INTEGER NOT NULL,
+    ultimo_acesso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_extracoes_ultimo_acesso ON extracoes (ultimo_acesso);
+CREATE TABLE IF NOT EXISTS contadores (
+    nome TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO contadores (nome, valor) VALUES ('hits', 0), ('misses', 0);
+"""
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _count(self, name: str) -> None:
+        self._conn.execute("UPDATE contadores SET valor = valor + 1 WHERE nome = ?", (name,))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT valor FROM extracoes WHERE chave = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            self._conn.execute("UPDATE extracoes SET ultimo_acesso = ? WHERE chave = ?", (time.time(), key))
+            self._count("hits")
+        return json.loads(row[0])
+
+    # Entradas maiores que o limite de bytes não são guardadas: sozinhas já estourariam o
+    # limite, e a evicção por tamanho acumulado apagaria o cache inteiro para abrir espaço
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO extracoes (chave, valor, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)",
+                    (key, payload, size, time.time()),
+                )
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # LRU: remove as entradas menos acessadas até respeitar os limites de quantidade e de tamanho
+    def _evict(self) -> None:
+        self._conn.execute(
+            "DELETE FROM extracoes WHERE chave IN ("
+            " SELECT chave FROM extracoes ORDER BY ultimo_acesso DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._conn.execute(
+            "DELETE FROM extracoes WHERE chave IN ("
+            " SELECT chave FROM (SELECT chave, SUM(tamanho) OVER (ORDER BY ultimo_acesso DESC) AS acumulado"
+            " FROM extracoes) WHERE acumulado > ?)",
+            (self.max_bytes,),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT nome, valor FROM contadores").fetchall())
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM extracoes").fetchone()
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entradas": entries, "bytes": size}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM extracoes")
+            self._conn.execute("UPDATE contadores SET valor = 0")
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+# Instância compartilhada pelo processo (uma conexão por processo, protegida por lock)
+def get_cache() -> ExtractionCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
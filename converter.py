@@ -0,0 +1,118 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from multiprocessing import util
+from typing import Optional
+
+# Conversão DOCX -> PDF pelo LibreOffice, usada só como fallback explícito quando a
+# leitura nativa do DOCX não encontra parâmetros: precisa de MTC_LIBREOFFICE_FALLBACK=1
+# e do LibreOffice instalado; sem isso o DOCX fica só com a leitura nativa.
+#
+# Se o unoserver estiver instalado (pip install unoserver), um único processo
+# LibreOffice fica aquecido em segundo plano e cada conversão é só uma chamada
+# ao unoconvert. Sem ele, cada conversão ainda abre o soffice, mas sempre com o
+# mesmo perfil de usuário já inicializado (evita o custo de primeira execução)
+# e serializada por lock, porque um perfil não pode ser usado por dois processos.
+# Em ambos os casos cada job grava num diretório de saída próprio.
+#
+# O unoserver não está em requirements.txt: ele roda sobre o Python do próprio
+# LibreOffice (módulo uno), então é instalado junto com o LibreOffice no servidor, não
+# no ambiente do app. Sem ele, cada conversão é um soffice novo (frio).
+#
+# Cada processo (inclusive os workers dos pools de jobs e do lote) tem seu próprio
+# conversor, encerrado quando o processo termina; ver get_converter().
+SOFFICE = os.environ.get("MTC_SOFFICE", "libreoffice")
+CONVERT_TIMEOUT = int(os.environ.get("MTC_CONVERT_TIMEOUT", "120"))
+FALLBACK_ENABLED = os.environ.get("MTC_LIBREOFFICE_FALLBACK", "0") == "1"
+
+
+def fallback_available() -> bool:
+    return FALLBACK_ENABLED and shutil.which(SOFFICE) is not None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LibreOfficeConverter:
+    def __init__(self, soffice: str = SOFFICE):
+        self.soffice = soffice
+        self.profile_dir = tempfile.mkdtemp(prefix="mtc_lo_profile_")
+        self._lock = threading.Lock()
+        self._server: Optional[subprocess.Popen] = None
+        self._port: Optional[int] = None
+
+    def _start_server(self) -> bool:
+        if self._server is not None and self._server.poll() is None:
+            return True
+        if not shutil.which("unoserver") or not shutil.which("unoconvert"):
+            return False
+        self._port = _free_port()
+        self._server = subprocess.Popen(
+            ["unoserver", "--interface", "127.0.0.1", "--port", str(self._port),
+             "--executable", shutil.which(self.soffice) or self.soffice,
+             "--user-installation", "file://" + self.profile_dir],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self._port), timeout=1):
+                    return True
+            except OSError:
+                time.sleep(0.2)
+        self.close()
+        return False
+
+    def convert(self, docx_path: str, output_dir: str) -> str:
+        pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+        with self._lock:
+            server = self._start_server()
+        if server:
+            subprocess.run(["unoconvert", "--port", str(self._port), "--convert-to", "pdf", docx_path, pdf_path],
+                           check=True, timeout=CONVERT_TIMEOUT, capture_output=True)
+        else:
+            with self._lock:
+                subprocess.run(
+                    [self.soffice, "-env:UserInstallation=file://" + self.profile_dir, "--headless",
+                     "--convert-to", "pdf", "--outdir", output_dir, docx_path],
+                    check=True, timeout=CONVERT_TIMEOUT, capture_output=True,
+                )
+        if not os.path.exists(pdf_path):
+            raise RuntimeError(f"LibreOffice não gerou o PDF de {os.path.basename(docx_path)}")
+        return pdf_path
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.terminate()
+            try:
+                self._server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._server.kill()
+            self._server = None
+
+    def shutdown(self) -> None:
+        self.close()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+_converter: Optional[LibreOfficeConverter] = None
+_converter_lock = threading.Lock()
+
+
+# Encerrado por um finalizador do multiprocessing, e não por atexit: os workers de um
+# ProcessPoolExecutor (fork) saem por os._exit, que pula o atexit e deixaria o unoserver
+# órfão; os finalizadores rodam tanto nos workers quanto no processo principal
+def get_converter() -> LibreOfficeConverter:
+    global _converter
+    with _converter_lock:
+        if _converter is None:
+            _converter = LibreOfficeConverter()
+            util.Finalize(_converter, _converter.shutdown, exitpriority=10)
+        return _converter
@@ -0,0 +1,240 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import metrics
+from validacao import match_valid_term, normalize_name
+
+# Histórico longitudinal dos resultados validados, em tabelas tipadas e indexadas.
+# Fica num banco irmão de dados_relatorio.db (que está versionado e mantém a tabela
+# antiga `dados`, só com TEXT), em modo WAL como o cache de extrações. Todo relatório
+# validado é gravado, com ou sem paciente (paciente NULL): vira uma linha em
+# `relatorios` e um resultado por parâmetro em `resultados`, numa única transação.
+# `totais` acumula, na mesma transação, quantas vezes cada parâmetro foi medido e saiu
+# do intervalo, para que a frequência da clínica inteira não precise varrer todos os
+# resultados. Os parâmetros são identificados pelo nome normalizado (ver parameter_key),
+# para que variações de caixa, parênteses ou OCR do mesmo nome não dividam o histórico;
+# `nome` guarda a primeira grafia vista, para exibição. As consultas devolvem arrays NumPy.
+HISTORY_PATH = os.environ.get(
+    "MTC_RESULTS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "historico_resultados.db")
+)
+
+BELOW, NORMAL, ABOVE = -1, 0, 1
+STATUS_CODES = {"Abaixo": BELOW, "Acima": ABOVE}
+
+
+# Chave do parâmetro no histórico: o termo de VALID_TERMS contido no nome (que absorve
+# sufixos e prefixos de OCR), ou o próprio nome, normalizados; os nomes se repetem entre
+# relatórios, então a chave de cada um é calculada uma vez
+@lru_cache(maxsize=4096)
+def parameter_key(name: str) -> str:
+    return normalize_name(match_valid_term(name) or name)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS relatorios (
+    id INTEGER PRIMARY KEY,
+    paciente TEXT,
+    terapeuta TEXT NOT NULL DEFAULT '',
+    registro TEXT NOT NULL DEFAULT '',
+    arquivo TEXT NOT NULL DEFAULT '',
+    sha256 TEXT NOT NULL,
+    criado_em REAL NOT NULL,
+    UNIQUE (paciente, sha256)
+);
+CREATE INDEX IF NOT EXISTS idx_relatorios_paciente ON relatorios (paciente, criado_em);
+CREATE TABLE IF NOT EXISTS parametros (
+    id INTEGER PRIMARY KEY,
+    chave TEXT NOT NULL UNIQUE,
+    nome TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resultados (
+    relatorio_id INTEGER NOT NULL REFERENCES relatorios (id),
+    parametro_id INTEGER NOT NULL REFERENCES parametros (id),
+    minimo REAL NOT NULL,
+    maximo REAL NOT NULL,
+    valor REAL NOT NULL,
+    status INTEGER NOT NULL,  -- -1 abaixo, 0 normal, 1 acima
+    PRIMARY KEY (relatorio_id, parametro_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_resultados_parametro ON resultados (parametro_id, status);
+CREATE TABLE IF NOT EXISTS totais (
+    parametro_id INTEGER PRIMARY KEY REFERENCES parametros (id),
+    medicoes INTEGER NOT NULL,
+    abaixo INTEGER NOT NULL,
+    acima INTEGER NOT NULL
+);
+"""
+
+
+class ResultsStore:
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._names: Dict[int, str] = {}
+
+    # Grava um relatório validado numa única transação; reenviar o mesmo arquivo para o
+    # mesmo paciente (ou de novo sem paciente) devolve o id já existente sem duplicar o histórico
+    def save_report(self, patient: Optional[str], parameters: Dict[str, Dict[str, float]], anomalies: List[Dict[str, Any]],
+                    sha256: str, therapist: str = "", registry: str = "", filename: str = "",
+                    created: Optional[float] = None) -> int:
+        status = {a["item"]: STATUS_CODES[a["status"]] for a in anomalies}
+        keys: Dict[str, str] = {}  # chave -> nome; se dois nomes têm a mesma chave, fica o primeiro
+        for name in parameters:
+            keys.setdefault(parameter_key(name), name)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM relatorios WHERE paciente IS ? AND sha256 = ?", (patient, sha256)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("COMMIT")
+                    return row[0]
+                report_id = self._conn.execute(
+                    "INSERT INTO relatorios (paciente, terapeuta, registro, arquivo, sha256, criado_em)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (patient, therapist, registry, filename, sha256, time.time() if created is None else created),
+                ).lastrowid
+                ids = self._parameter_ids(keys)
+                self._conn.executemany(
+                    "INSERT INTO resultados (relatorio_id, parametro_id, minimo, maximo, valor, status)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(report_id, ids[key], parameters[name]["min"], parameters[name]["max"], parameters[name]["valor"],
+                      status.get(name, NORMAL)) for key, name in keys.items()],
+                )
+                self._conn.executemany(
+                    "INSERT INTO totais (parametro_id, medicoes, abaixo, acima) VALUES (?, 1, ?, ?)"
+                    " ON CONFLICT (parametro_id) DO UPDATE SET medicoes = medicoes + 1,"
+                    " abaixo = abaixo + excluded.abaixo, acima = acima + excluded.acima",
+                    [(ids[key], int(status.get(name) == BELOW), int(status.get(name) == ABOVE))
+                     for key, name in keys.items()],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return report_id
+
+    # Ids dos parâmetros por chave (criados com o nome de exibição se ainda não existirem);
+    # chamado dentro da transação
+    def _parameter_ids(self, keys: Dict[str, str]) -> Dict[str, int]:
+        self._conn.executemany("INSERT OR IGNORE INTO parametros (chave, nome) VALUES (?, ?)", keys.items())
+        key_list = list(keys)
+        ids = {}
+        for start in range(0, len(key_list), 500):  # limite de variáveis por consulta do SQLite
+            chunk = key_list[start:start + 500]
+            ids.update(self._conn.execute(
+                f"SELECT chave, id FROM parametros WHERE chave IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return ids
+
+    def _parameter_names(self, ids: np.ndarray) -> List[str]:
+        if any(int(i) not in self._names for i in ids):
+            self._names = {i: n for i, n in self._conn.execute("SELECT id, nome FROM parametros")}
+        return [self._names[int(i)] for i in ids]
+
+    def patients(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT paciente FROM relatorios WHERE paciente IS NOT NULL ORDER BY paciente")]
+
+    # Histórico de um paciente como matrizes relatório x parâmetro (NaN onde o parâmetro
+    # não foi medido), com os relatórios em ordem cronológica
+    def patient_history(self, patient: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.id, r.criado_em, s.parametro_id, s.minimo, s.maximo, s.valor, s.status"
+                " FROM relatorios r JOIN resultados s ON s.relatorio_id = r.id WHERE r.paciente = ?",
+                (patient,),
+            ).fetchall()
+            data = np.array(rows, dtype=np.float64).reshape(-1, 7)
+            report_ids, first, report_pos = np.unique(data[:, 0], return_index=True, return_inverse=True)
+            parameter_ids, parameter_pos = np.unique(data[:, 2], return_inverse=True)
+            names = self._parameter_names(parameter_ids)
+
+        order = np.argsort(data[first, 1], kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        report_pos = rank[report_pos]
+        shape = (len(report_ids), len(parameter_ids))
+        matrices = {}
+        for key, column in (("minimos", 3), ("maximos", 4), ("valores", 5), ("status", 6)):
+            matrix = np.full(shape, np.nan)
+            matrix[report_pos, parameter_pos] = data[:, column]
+            matrices[key] = matrix
+        return {
+            "relatorios": report_ids[order].astype(np.int64),
+            "datas": data[first, 1][order],
+            "parametros": names,
+            **matrices,
+        }
+
+    # Variação de cada parâmetro entre relatórios consecutivos do paciente (absoluta e
+    # relativa ao valor anterior); NaN onde um dos dois relatórios não mediu o parâmetro
+    def consecutive_changes(self, patient: str) -> Dict[str, Any]:
+        history = self.patient_history(patient)
+        values = history["valores"]
+        change = np.diff(values, axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = change / np.abs(values[:-1])
+        return {
+            "relatorios": history["relatorios"][1:],
+            "datas": history["datas"][1:],
+            "parametros": history["parametros"],
+            "variacao": change,
+            "variacao_relativa": relative,
+        }
+
+    # Frequência com que cada parâmetro sai do intervalo normal em todos os relatórios (com
+    # e sem paciente), do mais frequente ao menos frequente
+    def out_of_range_frequency(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.nome, t.medicoes, t.abaixo, t.acima FROM totais t JOIN parametros p ON p.id = t.parametro_id"
+            ).fetchall()
+        names = [row[0] for row in rows]
+        counts = np.array([row[1:] for row in rows], dtype=np.int64).reshape(-1, 3)
+        frequency = (counts[:, 1] + counts[:, 2]) / np.maximum(counts[:, 0], 1)
+        order = np.argsort(-frequency, kind="stable")
+        return {
+            "parametros": [names[i] for i in order],
+            "medicoes": counts[order, 0],
+            "abaixo": counts[order, 1],
+            "acima": counts[order, 2],
+            "frequencia": frequency[order],
+        }
+
+
+_store: Optional[ResultsStore] = None
+_store_lock = threading.Lock()
+
+
+# Instância compartilhada pelo processo (uma conexão por processo, protegida por lock)
+def get_store() -> ResultsStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore()
+        return _store
+
+
+# Grava o relatório no histórico sem derrubar quem chamou: a validação já terminou, então
+# uma falha do banco (bloqueado, disco cheio, esquema antigo) só é registrada em stderr e
+# na métrica historico_erro, e o resultado da validação segue para o usuário
+def record_report(patient: Optional[str], parameters: Dict[str, Dict[str, float]], anomalies: List[Dict[str, Any]],
+                  sha256: str, therapist: str = "", registry: str = "", filename: str = "") -> Optional[int]:
+    try:
+        return get_store().save_report(patient, parameters, anomalies, sha256, therapist, registry, filename)
+    except Exception as e:
+        metrics.count("historico_erro")
+        print(f"⚠️ Falha ao gravar {filename or sha256} no histórico: {type(e).__name__}: {e}", file=sys.stderr)
+        return None
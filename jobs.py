@@ -0,0 +1,143 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+import metrics
+from validacao import extract_parameters, generate_report, validate_parameters
+
+# Fila local de jobs de extração/validação/relatório. O app enfileira o arquivo e
+# consulta o status, em vez de processar dentro da execução do script Streamlit.
+# A concorrência é limitada pelo número de processos e a fila por uma profundidade
+# máxima; o mesmo arquivo (com os mesmos dados do terapeuta) enviado de novo enquanto
+# ainda está em andamento reaproveita o job existente. Todo resultado validado é
+# gravado no histórico (historico.py), com o paciente quando informado.
+JOB_WORKERS = int(os.environ.get("MTC_JOB_WORKERS", str(min(2, os.cpu_count() or 1))))
+JOB_MAX_PENDING = int(os.environ.get("MTC_JOB_MAX_PENDING", "8"))
+JOB_HISTORY = int(os.environ.get("MTC_JOB_HISTORY", "100"))
+
+QUEUED, RUNNING, DONE, FAILED = "na fila", "processando", "concluído", "erro"
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+def run_job(path: str, filename: str, therapist: str, registry: str, ocr_workers: int,
+            patient: str = "", sha256: str = "") -> Dict[str, Any]:
+    with metrics.collect(filename, origem="app") as collector:
+        with metrics.stage("extracao"):
+            parameters = extract_parameters(path, ocr_workers=ocr_workers)
+        with metrics.stage("validacao"):
+            anomalies = validate_parameters(parameters)
+        report = None
+        if anomalies:
+            with metrics.stage("relatorio"):
+                buffer = BytesIO()
+                generate_report(anomalies, therapist, registry, buffer)
+                report = buffer.getvalue()
+        from historico import record_report  # NumPy só no worker, não no processo do app
+        with metrics.stage("historico"):
+            record_report(patient or None, parameters, anomalies, sha256, therapist, registry, filename)
+    return {"parametros": parameters, "anomalias": anomalies, "relatorio": report,
+            "metricas": collector.summary() if collector else None}
+
+
+class Job:
+    def __init__(self, job_id: str, key: str, filename: str, future: Future):
+        self.id = job_id
+        self.key = key
+        self.filename = filename
+        self.future = future
+        self.created = time.time()
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return RUNNING if self.future.running() else QUEUED
+        return FAILED if self.future.exception() is not None else DONE
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = self._new_pool()
+        # O OCR de cada job divide os núcleos restantes para não sobrecarregar a CPU
+        self._ocr_workers = max(1, (os.cpu_count() or 1) // max_workers)
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    # spawn: o servidor Streamlit tem várias threads, e fork a partir dele não é seguro
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def submit(self, data: bytes, filename: str, therapist: str, registry: str, patient: str = "") -> str:
+        sha256 = hashlib.sha256(data).hexdigest()
+        key = sha256 + f":{therapist}:{registry}:{patient}"
+        with self._lock:
+            if key in self._in_flight:
+                return self._in_flight[key]
+            if len(self._in_flight) >= self.max_pending:
+                raise QueueFullError(f"Fila cheia ({self.max_pending} relatórios em andamento). Tente novamente em instantes.")
+            fd, path = tempfile.mkstemp(prefix="mtc_job_", suffix=os.path.splitext(filename)[1].lower())
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            job_id = uuid.uuid4().hex
+            try:
+                future = self._pool.submit(run_job, path, filename, therapist, registry, self._ocr_workers,
+                                           patient, sha256)
+            except BrokenProcessPool:  # um worker morreu (ex.: falta de memória); recria o pool
+                self._pool = self._new_pool()
+                future = self._pool.submit(run_job, path, filename, therapist, registry, self._ocr_workers,
+                                           patient, sha256)
+            self._jobs[job_id] = Job(job_id, key, filename, future)
+            self._in_flight[key] = job_id
+            self._prune()
+        future.add_done_callback(lambda _: self._finish(key, path))
+        return job_id
+
+    def _finish(self, key: str, path: str) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if os.path.exists(path):
+            os.unlink(path)
+
+    # Descarta os jobs concluídos mais antigos além de JOB_HISTORY
+    def _prune(self) -> None:
+        finished = [job for job in self._jobs.values() if job.future.done()]
+        for job in sorted(finished, key=lambda j: j.created)[:max(0, len(finished) - JOB_HISTORY)]:
+            del self._jobs[job.id]
+
+    # Os jobs podem ser descartados por _prune() a qualquer momento (outra sessão enviando um
+    # arquivo): a busca é feita sob o lock e um id descartado devolve None
+    def _get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[str]:
+        job = self._get(job_id)
+        return job.status if job else None
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._get(job_id)
+        return job.future.result() if job else None
+
+    def error(self, job_id: str) -> Optional[BaseException]:
+        job = self._get(job_id)
+        return job.future.exception() if job else None
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de RSS
+    resource = None
+
+# Instrumentação leve do pipeline: tempo de parede e de CPU por etapa, contadores e
+# memória (RSS). As funções stage() e count() só registram algo dentro de collect();
+# fora dele (ou com MTC_METRICS=0) custam uma consulta a um ContextVar.
+# Cada coleta concluída é anexada como uma linha JSON em METRICS_PATH.
+#
+# pico_rss_mb é o maior RSS atual amostrado (/proc/self/statm) no início da coleta e ao
+# fim de cada etapa, ou seja, o pico deste processamento. pico_rss_processo_mb é o pico
+# de toda a vida do processo (ru_maxrss): nos workers de jobs e do lote, que processam
+# vários relatórios, ele carrega o pico do relatório mais pesado processado antes.
+ENABLED = os.environ.get("MTC_METRICS", "1") != "0"
+METRICS_PATH = os.environ.get(
+    "MTC_METRICS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "metricas.jsonl")
+)
+
+_current: ContextVar[Optional["Collector"]] = ContextVar("mtc_metrics", default=None)
+_write_lock = threading.Lock()
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _process_peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss em KB no Linux
+
+
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except OSError:  # fora do Linux não há amostragem; fica só o pico do processo
+        return 0.0
+
+
+class Collector:
+    def __init__(self, label: str, context: Dict[str, Any]):
+        self.label = label
+        self.context = context
+        self.started = time.time()
+        self.wall: Dict[str, float] = defaultdict(float)
+        self.cpu: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.peak_rss_mb = _current_rss_mb()
+
+    def add(self, name: str, wall: float, cpu: float) -> None:
+        self.wall[name] += wall
+        self.cpu[name] += cpu
+        self.calls[name] += 1
+        self.peak_rss_mb = max(self.peak_rss_mb, _current_rss_mb())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rotulo": self.label,
+            **self.context,
+            "inicio": self.started,
+            "etapas": {
+                name: {"wall_ms": round(self.wall[name] * 1000, 3), "cpu_ms": round(self.cpu[name] * 1000, 3),
+                       "chamadas": self.calls[name]}
+                for name in self.wall
+            },
+            "contadores": dict(self.counters),
+            "pico_rss_mb": round(self.peak_rss_mb, 1),
+            "pico_rss_processo_mb": round(_process_peak_rss_mb(), 1),
+        }
+
+
+class _Stage:
+    __slots__ = ("collector", "name", "wall", "cpu")
+
+    def __init__(self, collector: Collector, name: str):
+        self.collector = collector
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def __exit__(self, *exc) -> bool:
+        self.collector.add(self.name, time.perf_counter() - self.wall, time.process_time() - self.cpu)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    collector = _current.get()
+    return _NO_STAGE if collector is None else _Stage(collector, name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    collector = _current.get()
+    if collector is not None:
+        collector.counters[name] += amount
+
+
+def _write(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _write_lock, open(METRICS_PATH, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+# Coleta as métricas de um processamento (um relatório); devolve o Collector, ou None se desativado
+@contextmanager
+def collect(label: str, write: bool = True, **context) -> Iterator[Optional[Collector]]:
+    if not ENABLED:
+        yield None
+        return
+    collector = Collector(label, context)
+    token = _current.set(collector)
+    try:
+        with _Stage(collector, "total"):
+            yield collector
+    finally:
+        _current.reset(token)
+        if write and METRICS_PATH:
+            try:
+                _write(collector.summary())
+            except OSError:  # métricas nunca devem derrubar o processamento
+                pass
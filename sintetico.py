@@ -0,0 +1,236 @@
+"""Gerador de relatórios MTC sintéticos (PDF e DOCX) para benchmarks e checagens de precisão.
+
+Os nomes dos parâmetros vêm de validacao.VALID_TERMS; cada relatório traz o gabarito
+{nome: {"min", "max", "valor"}} usado para medir precisão e recall da extração.
+"""
+import os
+import random
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+import validacao
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+FONT_SIZE = 9
+ROW_HEIGHT = 16  # distância entre linhas da tabela
+LINE_HEIGHT = 10  # entrelinha de um nome quebrado dentro da mesma célula
+TOP_MARGIN, BOTTOM_MARGIN = 60, 50
+COLUMNS = {"item": 40, "intervalo": 340, "valor": 460}
+
+Row = Tuple[str, float, float, float]
+
+
+def _encodable(term: str) -> bool:
+    try:
+        term.encode("cp1252")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+# Termos que a extração consegue reconhecer e que não se fundem entre si na deduplicação
+def vocabulary() -> List[str]:
+    chosen: List[str] = []
+    for term in sorted(set(validacao.VALID_TERMS)):
+        name = term[0].upper() + term[1:]
+        if not _encodable(term) or not validacao.is_valid_name(name):
+            continue
+        if any(validacao.names_are_similar(name, other) for other in chosen):
+            continue
+        chosen.append(name)
+    return chosen
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.3f}".replace(".", ",")
+
+
+def generate_rows(parameter_count: int, rng: random.Random) -> List[Row]:
+    names = vocabulary()
+    rows = []
+    for name in rng.sample(names, min(parameter_count, len(names))):
+        low = round(rng.uniform(0.1, 60), 3)
+        high = round(low + rng.uniform(0.5, 30), 3)
+        if rng.random() < 0.3:  # ~30% fora do intervalo normal
+            value = round(rng.choice((low - rng.uniform(0.01, low), high + rng.uniform(0.01, 10))), 3)
+        else:
+            value = round(rng.uniform(low, high), 3)
+        rows.append((name, low, high, max(value, 0.001)))
+    return rows
+
+
+def truth(rows: List[Row]) -> Dict[str, Dict[str, float]]:
+    return {name: {"min": low, "max": high, "valor": value} for name, low, high, value in rows}
+
+
+def _split_name(name: str) -> Tuple[str, str]:
+    words = name.split()
+    cut = max(1, len(words) // 2)
+    return " ".join(words[:cut]), " ".join(words[cut:])
+
+
+def _escape(text: str) -> bytes:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("cp1252")
+
+
+# Distribui as linhas em páginas; nomes sorteados (prob. wrap_ratio) quebram em duas linhas
+# dentro da célula, com os números centralizados verticalmente, como nos relatórios reais
+def layout_pages(rows: List[Row], rng: random.Random, wrap_ratio: float = 0.2, pages: int = 0) -> List[List[tuple]]:
+    available = PAGE_HEIGHT - TOP_MARGIN - BOTTOM_MARGIN - 4 * ROW_HEIGHT
+    per_page = len(rows)
+    if pages:
+        per_page = max(1, -(-len(rows) // pages))
+    laid_out: List[List[tuple]] = [[]]
+    used = 0
+    for name, low, high, value in rows:
+        parts = _split_name(name) if len(name.split()) > 1 and rng.random() < wrap_ratio else (name,)
+        height = ROW_HEIGHT + (len(parts) - 1) * LINE_HEIGHT
+        if laid_out[-1] and (used + height > available or len(laid_out[-1]) >= per_page):
+            laid_out.append([])
+            used = 0
+        laid_out[-1].append((parts, low, high, value))
+        used += height
+    while pages and len(laid_out) < pages:
+        laid_out.append([])
+    return laid_out
+
+
+# Posições (x, y em pontos, origem no canto inferior esquerdo) de cada texto da página
+def _page_layout(page_rows: List[tuple], page_number: int) -> List[Tuple[float, float, str]]:
+    placements = []
+    y = PAGE_HEIGHT - TOP_MARGIN
+    placements.append((COLUMNS["item"], y, "Cartão do Relatório de Análise"))
+    y -= ROW_HEIGHT
+    placements.append((COLUMNS["item"], y, f"Nome: Exemplo   Sexo: Feminino   Idade: 31   Página {page_number}"))
+    y -= 2 * ROW_HEIGHT
+    placements.append((COLUMNS["item"], y, "Item de teste"))
+    placements.append((COLUMNS["intervalo"], y, "Intervalo normal"))
+    placements.append((COLUMNS["valor"], y, "Valor de medição real"))
+    y -= ROW_HEIGHT
+    for parts, low, high, value in page_rows:
+        for offset, part in enumerate(parts):
+            placements.append((COLUMNS["item"], y - offset * LINE_HEIGHT, part))
+        middle = y - (len(parts) - 1) * LINE_HEIGHT / 2
+        placements.append((COLUMNS["intervalo"], middle, f"{_fmt(low)} - {_fmt(high)}"))
+        placements.append((COLUMNS["valor"], middle, _fmt(value)))
+        y -= ROW_HEIGHT + (len(parts) - 1) * LINE_HEIGHT
+    return placements
+
+
+def _text_stream(placements: List[Tuple[float, float, str]]) -> bytes:
+    ops = [b"BT", b"/F1 %d Tf" % FONT_SIZE]
+    for x, y, text in placements:
+        ops.append(b"1 0 0 1 %.1f %.1f Tm (" % (x, y) + _escape(text) + b") Tj")
+    ops.append(b"ET")
+    return b"\n".join(ops)
+
+
+def _font(size: int):
+    from PIL import ImageFont
+    for name in (os.environ.get("MTC_BENCH_FONT", ""), "DejaVuSans.ttf", "LiberationSans-Regular.ttf", "Arial.ttf"):
+        if not name:
+            continue
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+# Página escaneada: o mesmo conteúdo rasterizado em tons de cinza, sem texto nativo (exige OCR)
+def _render_page_image(placements: List[Tuple[float, float, str]], dpi: int):
+    from PIL import Image, ImageDraw
+    scale = dpi / 72
+    image = Image.new("L", (round(PAGE_WIDTH * scale), round(PAGE_HEIGHT * scale)), 255)
+    draw = ImageDraw.Draw(image)
+    font = _font(round(FONT_SIZE * scale))
+    for x, y, text in placements:
+        draw.text((x * scale, (PAGE_HEIGHT - y) * scale), text, font=font, fill=0, anchor="ls")
+    return image
+
+
+# PDF mínimo (Helvetica, WinAnsiEncoding), escrito à mão para não depender de bibliotecas de
+# geração; as páginas em image_pages (1-based) saem como imagem, sem texto nativo
+def write_pdf(path: str, pages: List[List[tuple]], image_pages: Iterable[int] = (), dpi: int = 150) -> None:
+    image_pages = set(image_pages)
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    def add_stream(header: bytes, data: bytes) -> int:
+        return add(b"<< " + header + b" /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = add(b"")
+    kids = []
+    for number, page_rows in enumerate(pages, start=1):
+        placements = _page_layout(page_rows, number)
+        if number in image_pages:
+            image = _render_page_image(placements, dpi)
+            xobject = add_stream(
+                b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray /BitsPerComponent 8"
+                b" /Filter /FlateDecode" % image.size,
+                zlib.compress(image.tobytes()),
+            )
+            contents = add_stream(b"", b"q %d 0 0 %d 0 0 cm /Im1 Do Q" % (PAGE_WIDTH, PAGE_HEIGHT))
+            resources = b"<< /XObject << /Im1 %d 0 R >> >>" % xobject
+        else:
+            contents = add_stream(b"", _text_stream(placements))
+            resources = b"<< /Font << /F1 %d 0 R >> >>" % font
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, resources, contents)
+        ))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+# Gera o PDF e devolve o gabarito; ocr_pages páginas (sorteadas) saem só como imagem
+def generate_pdf(path: str, parameter_count: int = 120, wrap_ratio: float = 0.2, pages: int = 0,
+                 ocr_pages: int = 0, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(seed)
+    rows = generate_rows(parameter_count, rng)
+    laid_out = layout_pages(rows, rng, wrap_ratio, pages)
+    image_pages = rng.sample(range(1, len(laid_out) + 1), min(ocr_pages, len(laid_out)))
+    write_pdf(path, laid_out, image_pages)
+    return truth(rows)
+
+
+# DOCX com o mesmo conteúdo em tabela; nomes quebrados viram uma quebra de linha na célula
+def write_docx(path: str, rows: List[Row], rng: random.Random, wrap_ratio: float = 0.2) -> None:
+    from docx import Document
+    doc = Document()
+    doc.add_paragraph("Cartão do Relatório de Análise")
+    doc.add_paragraph("Nome: Exemplo   Sexo: Feminino   Idade: 31")
+    table = doc.add_table(rows=1, cols=3)
+    for cell, text in zip(table.rows[0].cells, ("Item de teste", "Intervalo normal", "Valor de medição real")):
+        cell.text = text
+    for name, low, high, value in rows:
+        parts = _split_name(name) if len(name.split()) > 1 and rng.random() < wrap_ratio else (name,)
+        cells = table.add_row().cells
+        cells[0].text = "\n".join(parts)
+        cells[1].text = f"{_fmt(low)} - {_fmt(high)}"
+        cells[2].text = _fmt(value)
+    doc.save(path)
+
+
+def generate_docx(path: str, parameter_count: int = 120, wrap_ratio: float = 0.2, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(seed)
+    rows = generate_rows(parameter_count, rng)
+    write_docx(path, rows, rng, wrap_ratio)
+    return truth(rows)
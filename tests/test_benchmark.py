@@ -0,0 +1,33 @@
+import benchmark
+
+
+def _result(ms=100.0, rss=80.0, recall=1.0, pages=10.0):
+    return {"ms_por_relatorio": ms, "relatorios_por_s": 1000 / ms, "paginas_por_s": pages,
+            "etapas_ms": {"extracao": ms * 0.9}, "recall": recall, "pico_rss_mb": rss}
+
+
+def _baseline(**kwargs):
+    return {"config": {}, "resultados": {"pdf": _result(**kwargs)}}
+
+
+def test_no_regression_within_limit():
+    assert benchmark._regressions(_baseline(), {"pdf": _result(ms=110.0, rss=85.0)}, 0.2) == []
+
+
+def test_time_and_throughput_regressions():
+    found = benchmark._regressions(_baseline(), {"pdf": _result(ms=150.0, pages=6.0)}, 0.2)
+    assert any("ms_por_relatorio" in line for line in found)
+    assert any("relatorios_por_s" in line for line in found)
+    assert any("paginas_por_s" in line for line in found)
+
+
+def test_memory_regression_uses_its_own_limit():
+    results = {"pdf": _result(rss=92.0)}
+    assert benchmark._regressions(_baseline(), results, 0.2) == []
+    found = benchmark._regressions(_baseline(), results, 0.2, memory_limit=0.1)
+    assert found == ["[pdf] pico_rss_mb: 80 -> 92 MB (+15%)"]
+
+
+def test_recall_drop_is_a_regression():
+    found = benchmark._regressions(_baseline(), {"pdf": _result(recall=0.9)}, 0.2)
+    assert found == ["[pdf] recall: 100.0% -> 90.0%"]
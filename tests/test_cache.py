@@ -0,0 +1,19 @@
+from cache import ExtractionCache
+
+
+def test_oversized_entry_keeps_existing_entries(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.db"), max_bytes=30)
+    cache.put("a", {"x": 1})
+    cache.put("grande", {"x": "0" * 40})
+    assert cache.get("grande") is None
+    assert cache.get("a") == {"x": 1}
+
+
+def test_byte_limit_evicts_least_recent(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.db"), max_bytes=50)
+    cache.put("a", {"x": "0" * 10})
+    cache.put("b", {"x": "1" * 10})
+    cache.get("a")
+    cache.put("c", {"x": "2" * 10})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
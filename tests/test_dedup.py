@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+import benchmark
+import sintetico
+import validacao
+
+
+# Relatório sintético em que parte dos parâmetros reaparece com variações do nome: as de
+# benchmark._name_variant (caixa, parênteses, prefixos) e sufixos curtos, que deixam o nome
+# parecido mas não idêntico e forçam a regra de mesclagem por similaridade
+def _report_rows(seed: int) -> list:
+    rng = random.Random(seed)
+    rows = sintetico.generate_rows(80, rng)
+    for name, low, high, value in rng.sample(rows, 40):
+        variant = benchmark._name_variant(rng, name) if rng.random() < 0.5 else name + rng.choice(("s", " total"))
+        rows.append((variant, round(low + 1, 3), round(high + 1, 3), value))
+    rng.shuffle(rows)
+    return rows
+
+
+def _write_report(path, fmt: str, rows: list, seed: int) -> None:
+    rng = random.Random(seed)
+    if fmt == "pdf":
+        sintetico.write_pdf(str(path), sintetico.layout_pages(rows, rng, wrap_ratio=0.2))
+    else:
+        sintetico.write_docx(str(path), rows, rng, wrap_ratio=0.2)
+
+
+# O ParameterIndex precisa produzir exatamente o mesmo resultado da deduplicação original
+# (comparação com todas as chaves) para as linhas que a extração lhe entrega
+@pytest.mark.parametrize("fmt", ["pdf", "docx"])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_indexed_dedup_matches_legacy(tmp_path, monkeypatch, fmt, seed):
+    fed = []
+    add = validacao.ParameterIndex.add
+
+    def recording_add(self, *row):
+        fed.append(row)
+        return add(self, *row)
+
+    monkeypatch.setattr(validacao.ParameterIndex, "add", recording_add)
+    path = tmp_path / f"relatorio.{fmt}"
+    _write_report(path, fmt, _report_rows(seed), seed)
+
+    parameters = validacao.extract_parameters(str(path), use_cache=False)
+
+    assert parameters
+    assert len(fed) > len(parameters)  # houve repetições a deduplicar
+    assert parameters == benchmark._legacy_dedup(fed)
@@ -0,0 +1,24 @@
+from docx import Document
+
+from validacao import extract_parameters_from_docx
+
+ROWS = [
+    ("Índice de colágeno da pele", "4,2 - 6,5", "3,1", "Abaixo"),
+    ("Coeficiente de secreção de insulina", "2,0 - 3,0", "2,5", "Normal"),
+]
+
+
+def test_extra_result_column(tmp_path):
+    path = tmp_path / "relatorio.docx"
+    doc = Document()
+    table = doc.add_table(rows=1, cols=4)
+    for cell, text in zip(table.rows[0].cells, ("Item de teste", "Intervalo normal", "Valor de medição real", "Resultado do teste")):
+        cell.text = text
+    for row in ROWS:
+        for cell, text in zip(table.add_row().cells, row):
+            cell.text = text
+    doc.save(path)
+
+    parameters = extract_parameters_from_docx(str(path), use_cache=False)
+    assert parameters["Índice de colágeno da pele"] == {"min": 4.2, "max": 6.5, "valor": 3.1}
+    assert parameters["Coeficiente de secreção de insulina"] == {"min": 2.0, "max": 3.0, "valor": 2.5}
@@ -0,0 +1,52 @@
+import sqlite3
+
+import batch
+import historico
+import metrics
+import sintetico
+import validacao
+from cache import ExtractionCache
+from historico import ResultsStore
+
+
+def _values(value):
+    return {"min": 1.0, "max": 2.0, "valor": value}
+
+
+# Variações de caixa, parênteses e espaços do mesmo nome são o mesmo parâmetro no histórico
+def test_name_variants_share_parameter(tmp_path):
+    store = ResultsStore(str(tmp_path / "historico.db"))
+    store.save_report("Ana", {"Bilirrubina total (tbil)": _values(1.5)}, [], "a", created=1.0)
+    store.save_report("Ana", {"bilirrubina  total tbil": _values(2.5)},
+                      [{"item": "bilirrubina  total tbil", "status": "Acima"}], "b", created=2.0)
+
+    history = store.patient_history("Ana")
+    assert history["parametros"] == ["Bilirrubina total (tbil)"]
+    assert history["valores"][:, 0].tolist() == [1.5, 2.5]
+
+    frequency = store.out_of_range_frequency()
+    assert frequency["parametros"] == ["Bilirrubina total (tbil)"]
+    assert frequency["medicoes"].tolist() == [2] and frequency["acima"].tolist() == [1]
+
+
+def test_variants_in_one_report_keep_first(tmp_path):
+    store = ResultsStore(str(tmp_path / "historico.db"))
+    store.save_report(None, {"Bilirrubina total (tbil)": _values(1.5), "BILIRRUBINA TOTAL TBIL": _values(9.0)}, [], "a")
+
+    assert store.out_of_range_frequency()["medicoes"].tolist() == [1]
+
+
+# Uma falha ao gravar o histórico não transforma uma validação concluída em erro
+def test_history_failure_keeps_result(tmp_path, monkeypatch, capsys):
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(historico, "get_store", locked)
+    monkeypatch.setattr(validacao, "get_cache", lambda: ExtractionCache(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(metrics, "METRICS_PATH", str(tmp_path / "metricas.jsonl"))
+    path = tmp_path / "relatorio.pdf"
+    truth = sintetico.generate_pdf(str(path), parameter_count=10)
+
+    record = batch.process_file(str(path), None, "", "")
+
+    assert record["status"] == "ok" and record["parametros"] == truth
+    assert "database is locked" in capsys.readouterr().err
@@ -0,0 +1,47 @@
+import sintetico
+import validacao
+
+HEADER = ("Item de teste", "Intervalo normal", "Valor de medição real")
+ROWS = [("Bebida estimulante", 2.1, 5.2, 6.0), ("Bilirrubina total (tbil)", 0.5, 1.5, 1.0)]
+
+
+def _write(path, rows, monkeypatch=None):
+    if monkeypatch is not None:  # página sem o cabeçalho da tabela
+        layout = sintetico._page_layout
+        monkeypatch.setattr(sintetico, "_page_layout",
+                            lambda page_rows, number: [p for p in layout(page_rows, number) if p[2] not in HEADER])
+    sintetico.write_pdf(str(path), [[((name,), low, high, value) for name, low, high, value in rows]])
+
+
+# "intervalo" no nome de um parâmetro não pode ser tomado pelo cabeçalho da coluna de intervalos
+def test_range_word_in_name_without_header(tmp_path, monkeypatch):
+    path = tmp_path / "sem_cabecalho.pdf"
+    _write(path, [("Estômago e intervalo intestinal", 1.2, 3.4, 2.0)] + ROWS, monkeypatch)
+
+    parameters = validacao.extract_parameters(str(path), use_cache=False)
+
+    assert parameters == {name: {"min": low, "max": high, "valor": value} for name, low, high, value in ROWS}
+
+
+def test_header_sets_range_column(tmp_path):
+    path = tmp_path / "com_cabecalho.pdf"
+    _write(path, ROWS)
+
+    parameters = validacao.extract_parameters(str(path), use_cache=False)
+
+    assert set(parameters) == {name for name, *_ in ROWS}
+
+
+# Um intervalo deslocado para a esquerda do cabeçalho não pode perder o mínimo para o nome
+def test_range_left_of_header(tmp_path, monkeypatch):
+    shifted = ("Colesterol total (tc)", 116.34, 220.62, 300.0)
+    layout = sintetico._page_layout
+    monkeypatch.setattr(sintetico, "_page_layout", lambda page_rows, number: [
+        (x - 10, y, text) if text == "116,340 - 220,620" else (x, y, text) for x, y, text in layout(page_rows, number)
+    ])
+    path = tmp_path / "deslocado.pdf"
+    _write(path, ROWS + [shifted])
+
+    parameters = validacao.extract_parameters(str(path), use_cache=False)
+
+    assert parameters == {name: {"min": low, "max": high, "valor": value} for name, low, high, value in ROWS + [shifted]}
@@ -1,15 +1,30 @@
 import re
-from typing import Dict, List, Optional
-import pdfplumber
-from docx import Document
+import bisect
+import statistics
+from typing import IO, TYPE_CHECKING, Dict, List, Optional, Union
 import os
+import tempfile
 from difflib import SequenceMatcher
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+from cache import file_sha256, get_cache
+from converter import fallback_available, get_converter
+import metrics
+
+# pdfplumber, pytesseract (que carrega o pandas), pdf2image, PIL e python-docx só são
+# importados dentro das funções que os usam: o Streamlit reexecuta app.py a cada
+# interação e o app não deve pagar por eles até um arquivo ser de fato processado.
+if TYPE_CHECKING:
+    from docx.document import Document
+    from PIL import Image
 
 # Defina o caminho para o Tesseract (ajuste para o seu sistema)
-pytesseract.pytesseract.tesseract_cmd = r'/usr/local/bin/tesseract'  # Exemplo para Mac; ajuste para Windows: r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+TESSERACT_CMD = r'/usr/local/bin/tesseract'  # Exemplo para Mac; ajuste para Windows: r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+
+def _pytesseract():
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return pytesseract
 
 # Funções utilitárias (inalteradas)
 def clean_text(text: Optional[str]) -> str:
@@ -21,27 +36,358 @@ def extract_numbers(text: str) -> List[float]:
     matches = re.findall(r"[-+]?\d+(?:[.,]\d+)?", text)
     return [float(m.replace(",", ".")) for m in matches]
 
+HEADER_KEYWORDS = (
+    "os resultados do teste apenas para referência", "cartão do relatório de análise", "nome: exemplo", "sexo: feminino", "idade: 31", "figura: peso padrão", "período do teste", "resultados reais do teste", "conselho de peritos", "real", "item de teste intervalo normal valor de medição real"
+)
+
 def is_header_line(line: str) -> bool:
     line_lower = line.lower()
-    invalid_keywords = [
-        "os resultados do teste apenas para referência", "cartão do relatório de análise", "nome: exemplo", "sexo: feminino", "idade: 31", "figura: peso padrão", "período do teste", "resultados reais do teste", "conselho de peritos", "real", "item de teste intervalo normal valor de medição real"
-    ]
-    return any(kw in line_lower for kw in invalid_keywords) or len(line) < 20 or not re.search(r'[a-zA-Z]{5,}', line)
+    return any(kw in line_lower for kw in HEADER_KEYWORDS) or len(line) < 20 or not re.search(r'[a-zA-Z]{5,}', line)
+
+# Dicionário de termos válidos, compilado uma única vez na importação do módulo
+VALID_TERMS = (  # Expandida com mais termos do PDF
+    "viscosidade do sangue",
+    "cristal de colesterol",
+    "gordura do sangue",
+    "resistência vascular",
+    "elasticidade vascular",
+    "demanda de sangue do miocárdio",
+    "volume de perfusão do sangue do miocárdio",
+    "consumo de oxigênio do miocárdio",
+    "volume sistólico",
+    "impedância do bombeamento de sangue do ventrículo esquerdo",
+    "força de bombeamento efetiva do ventrículo esquerdo",
+    "elasticidade da artéria coronária",
+    "pressão de perfusão da artéria coronária",
+    "elasticidade dos vasos sanguíneos do cérebro",
+    "situação do fornecimento de sangue ao tecido cerebral",
+    "coeficiente de secreção de pepsina",
+    "coeficiente das funções peristálticas gástricas",
+    "coeficiente das funções de absorção gástricas",
+    "coeficiente das funções peristálticas do intestino delgado",
+    "coeficiente das funções de absorção do intestino delgado",
+    "metabolismo de proteínas",
+    "função de produção de energia",
+    "função de desintoxicação",
+    "função de secreção de bílis",
+    "teor de gordura do fígado",
+    "globulina do soro sanguíneo (a/g)",
+    "bilirrubina total (tbil)",
+    "fosfatase alcalina (alp)",
+    "ácido biliar total do soro sanguíneo (tba)",
+    "bilirrubina (dbil)",
+    "insulina",
+    "polipeptídeo pancreático (pp)",
+    "glucagon",
+    "urobilinogênio",
+    "ácido úrico",
+    "nitrogênio uréico",
+    "proteína urinária",
+    "atividade pulmonar vc",
+    "capacidade pulmonar total tlc",
+    "resistência das vias aéreas ram",
+    "teor de oxigênio no sangue arterial paco2",
+    "fornecimento de sangue ao cérebro",
+    "arterioesclerose cerebral",
+    "condição das funções neurológicas",
+    "indicador de depressão",
+    "indicador de memória (zs)",
+    "dimensão da protusão da fibra lombar",
+    "grau de adesão da musculatura dos ombros",
+    "limite de circulação dos membros",
+    "grau de envelhecimento dos ligamentos",
+    "coeficiente de oesteoclastos",
+    "perda de cálcio",
+    "grau de hiperplasia óssea",
+    "grau de osteoporose",
+    "densidade óssea",
+    "calcificação coluna cervical",
+    "calcificação coluna lombar",
+    "coeficiente de hiperplasia óssea",
+    "coeficiente de osteoporose",
+    "coeficiente de reumatismo",
+    "coeficiente de secreção de insulina",
+    "coeficiente de açúcar no sangue",
+    "coeficiente de açúcar na urina",
+    "capacidade de reação fisica",
+    "capacidade cerebral",
+    "falta de água",
+    "hipóxia",
+    "ph",
+    "bebida estimulante",
+    "radiação eletromagnética",
+    "tabaco/nicotina e outros",
+    "resíduos tóxicos de pesticida",
+    "cálcio",
+    "ferro",
+    "zinco",
+    "selênio",
+    "fósforo",
+    "potássio",
+    "magnésio",
+    "cobre",
+    "cobalto",
+    "manganês",
+    "iodo",
+    "níquel",
+    "flúor",
+    "molibdênio",
+    "vanádio",
+    "estanho",
+    "silício",
+    "estrôncio",
+    "boro",
+    "estrogênio",
+    "gonadotrofina",
+    "prolactina",
+    "progesterona",
+    "coeficiente de vaginite",
+    "coeficiente de inflamação pélvica",
+    "coeficiente de anexite",
+    "coeficiente de cervicite",
+    "coeficiente de cisto nos ovarios",
+    "índice dos radicais livres da pele",
+    "índice de colágeno da pele",
+    "índice de oleosidade da pele",
+    "índice de imunidade da pele",
+    "índice de hidratação da pele",
+    "perda de hidratação da pele",
+    "índice de dilatação dos vasos sanguíneos da pele",
+    "índice de elasticidade da pele",
+    "índice de melanina da pele",
+    "índice de queratinócitos da pele",
+    "índice de secreção da tireóide",
+    "índice de secreção da paratireóide",
+    "índice de secreção da glândula supra-renal",
+    "índice de secreção da pituitária",
+    "índice de secreção da glândula pineal",
+    "índice de secreção do timo",
+    "índice gonadal",
+    "índice de linfonodo",
+    "índice de imunidade das amígdalas",
+    "índice da medula óssea",
+    "índice do baço",
+    "índice do timo",
+    "índice de imunoglobulina",
+    "índice de imunidade do trato respiratório",
+    "índice de imunidade gastrointestinal",
+    "índice de imunidade da mucosa",
+    "coeficiente de fibrosidade da glândula mamária",
+    "coeficiente de mastite aguda",
+    "coeficiente de mastite crônica",
+    "coeficiente de distúrbios endócrinos",
+    "coeficiente de fibroadenoma",
+    "vitamina a",
+    "vitamina b1",
+    "vitamina b2",
+    "vitamina b3",
+    "vitamina b6",
+    "vitamina b12",
+    "vitamina c",
+    "vitamina d3",
+    "vitamina e",
+    "vitamina k",
+    "lisina",
+    "triptofano",
+    "fenilalanina",
+    "metionina",
+    "treonina",
+    "isoleucina",
+    "leucina",
+    "valina",
+    "histidina",
+    "arginina",
+    "fosfatase alcalina óssea",
+    "osteocalcina",
+    "cartilagem grandes articulaçoes",
+    "cartilagem pequenas articulações",
+    "linha epifisária",
+    "bolsas sob os olhos",
+    "colágeno das rugas nos olhos",
+    "pigmentação da pele (índice de olheiras)",
+    "obstrução linfática",
+    "afrouxamento e queda",
+    "edema",
+    "atividade das células dos olhos",
+    "fadiga visual",
+    "chumbo",
+    "mercúrio",
+    "cádmio",
+    "crômio",
+    "arsênico",
+    "antimônio",
+    "tálio",
+    "alumínio",
+    "índice de alergia a medicamentos",
+    "índice de alergia álcool",
+    "índice de alergia ao pólen",
+    "índice de alergia antibioticos",
+    "fibra química",
+    "alergia a tintas e vernizes",
+    "índice de alergia a poeira",
+    "índice de alergia a fumos",
+    "alergia a corante de tintas cabelo",
+    "índice alergia de contato",
+    "alergia a acessorios de metal",
+    "índice alergia marisco",
+    "índice alergia proteína do leite",
+    "nicotinamida",
+    "biotina",
+    "ácido pantotênico",
+    "ácido fólico",
+    "coenzima q10",
+    "glutationa",
+    "coeficiente de metabolismo anormal de lipidos",
+    "anormalidades tecido adiposo",
+    "coeficiente de hiperinsulinemia",
+    "coeficiente de anomalia hipotálamo núcleo",
+    "coeficiente de conteúdo anormal de triglicerídeos",
+    "olhos",
+    "dentes",
+    "cabelo e pele",
+    "sistema endocrino",
+    "circulação de sangue do coração e do cérebro",
+    "estômago e intervalo intestinal",
+    "sistema imunologico",
+    "articulações",
+    "tecido muscular",
+    "metabolismo da gordura",
+    "desintoxicação e metabolismo",
+    "sistema reprodutivo",
+    "sistema nervoso",
+    "esqueleto",
+    "coeficiente da função peristáltica do intestino grosso",
+    "coeficiente de absorção do cólon",
+    "coeficiente das bactérias intestinais (flora intestinal)",
+    "coeficiente de pressão intraluminal",
+    "tiroxina livre (t4)",
+    "tiroglobulina",
+    "os anticorpos antitireoglobulina",
+    "triiodotironina (t3)",
+    "ácido linoleico",
+    "α-ácido linolênico",
+    "γ-ácido linolênico",
+    "ácido araquidônico",
+    "estrogénio",
+    "andrógeno",
+    "progesterona(p)",
+    "hormona luteinizante (lh)",
+    "prolactina(prl)",
+    "hormona estimuladora folícula (fsh)",
+    "meridiano do pulmão tai yin da mão",
+    "meridiano do intestino grosso yangming da mão",
+    "meridiano do estômago yangming do pé",
+    "meridiano baço/pancreas tai yn do pe",
+    "meridiano do coração shao yin da mão",
+    "meridiano do intestino delgado tai yang da mão",
+    "meridiano da bexiga tai yang do pé",
+    "meridiano dos rins shao yin do pé",
+    "pericárdio",
+    "triplo aquecedor shao yang da mão",
+    "meridiano da vesícula biliar shao yang do pé",
+    "meridiano do fígado jue yin do pé",
+    "ren mai",
+    "meridiano governador",
+    "meridiano vital",
+    "da mai",
+    "índice de acidente vascular cerebral",
+    "pulso (sv)",
+    "resistência periférica do coração (trr)",
+    "coeficiente da onda de pulso k",
+    "saturação do oxigênio do sangue cerebrovascular (sa)",
+    "volume do oxigênio do sangue cerebrovascular (caco2)",
+    "pressão do oxigênio do sangue cerebrovascular (pao2)",
+    "viscosidade do sangue",
+    "colesterol total (tc)",
+    "triglicerídeos (tg)",
+    "lipoproteína de alta densidade (hdl-c)",
+    "lipoproteína de baixa densidade (ldl-c)",
+    "gordura neutra (mb)",
+    "complexo imunológico circulatório (cic)",
+    "hormona beta (folículo estimulante) fsh",
+    "proteína de resposta",
+    "fibrinogênio",
+    "taxa de sedimentação",
+    "índice imunitário de barreira tecidual",
+    "índice de células imunitárias inatas",
+    "índice de molécula imunitária inata",
+    "índice imunitário celular",
+    "índice de imunidade humoral",
+    "vergonha",
+    "culpa",
+    "apatia",
+    "dor",
+    "medo",
+    "desejo",
+    "raiva",
+    "orgulho",
+    "coragem",
+    "neutralidade",
+    "vontade",
+    "aceitação",
+    "razão",
+    "amor",
+    "alegria",
+    "paz",
+    "iluminismo",
+    "volume maré(vt)",
+    "volume inspiratório (ti)",
+    "capacidade residual funcional(frc)",
+    "volume residual(rv)",
+    "índice fosfolipídico",
+    "índice esfingolípide",
+    "índice de esfingomielilina",
+    "índice de lecitina",
+    "índice fosfolípide cerebral",
+    "índice lipossômico",
+    "índice de ácidos gordos saturados",
+    "índice de ácidos gordos não saturados",
+    "índice de ácidos gordos essenciais",
+    "índice de triglicéridos"
+)
+INVALID_STARTS = ('(', ')', '-', 'do', 'da', 'de', 'e', 'o', 'a', 'ncia', 'gordo', 'grande', 'nível de')
+INVALID_ENDS = (' de', ' do', ' da', ' ncia', ' o', '-', 'função', 'sistema', 'cartão do relatório')
+
+def _compile_terms(terms) -> re.Pattern:
+    # Monta uma trie dos termos e a converte numa única expressão regular:
+    # em cada posição do texto o custo é o da profundidade da trie, e não o
+    # de percorrer a lista inteira de termos.
+    trie: Dict[str, dict] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def to_regex(node: Dict[str, dict]) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_end:  # opcional guloso: prefere o termo mais longo na mesma posição
+            body = "(?:" + body + ")?"
+        return body
+
+    return re.compile(to_regex(trie))
+
+_VALID_TERMS_RE = _compile_terms(VALID_TERMS)
+_NON_ALPHA_RE = re.compile(r'[^a-zA-Z]')
+
+# Retorna o termo canônico de VALID_TERMS contido no nome (o mais longo na posição mais à esquerda), ou None
+def match_valid_term(name: str) -> Optional[str]:
+    match = _VALID_TERMS_RE.search(name.lower())
+    return match.group(0) if match else None
 
 def is_valid_name(name: str) -> bool:
     name_lower = name.lower()
-    invalid_starts = ['(', ')', '-', 'do', 'da', 'de', 'e', 'o', 'a', 'ncia', 'gordo', 'grande', 'nível de']
-    invalid_ends = [' de', ' do', ' da', ' ncia', ' o', '-', 'função', 'sistema', 'cartão do relatório']
-    if name_lower.startswith(tuple(invalid_starts)) or name_lower.endswith(tuple(invalid_ends)):
+    if name_lower.startswith(INVALID_STARTS) or name_lower.endswith(INVALID_ENDS):
         return False
-    char_count = len(re.sub(r'[^a-zA-Z]', '', name))
+    char_count = len(_NON_ALPHA_RE.sub('', name))
     word_count = len(name.split())
     if char_count < 10 or char_count > 80 or word_count > 10:
         return False
-    valid_terms = [  # Expandida com mais termos do PDF
-        "viscosidade do sangue", "cristal de colesterol", "gordura do sangue", "resistência vascular", "elasticidade vascular", "demanda de sangue do miocárdio", "volume de perfusão do sangue do miocárdio", "consumo de oxigênio do miocárdio", "volume sistólico", "impedância do bombeamento de sangue do ventrículo esquerdo", "força de bombeamento efetiva do ventrículo esquerdo", "elasticidade da artéria coronária", "pressão de perfusão da artéria coronária", "elasticidade dos vasos sanguíneos do cérebro", "situação do fornecimento de sangue ao tecido cerebral", "coeficiente de secreção de pepsina", "coeficiente das funções peristálticas gástricas", "coeficiente das funções de absorção gástricas", "coeficiente das funções peristálticas do intestino delgado", "coeficiente das funções de absorção do intestino delgado", "metabolismo de proteínas", "função de produção de energia", "função de desintoxicação", "função de secreção de bílis", "teor de gordura do fígado", "globulina do soro sanguíneo (a/g)", "bilirrubina total (tbil)", "fosfatase alcalina (alp)", "ácido biliar total do soro sanguíneo (tba)", "bilirrubina (dbil)", "insulina", "polipeptídeo pancreático (pp)", "glucagon", "urobilinogênio", "ácido úrico", "nitrogênio uréico", "proteína urinária", "atividade pulmonar vc", "capacidade pulmonar total tlc", "resistência das vias aéreas ram", "teor de oxigênio no sangue arterial paco2", "fornecimento de sangue ao cérebro", "arterioesclerose cerebral", "condição das funções neurológicas", "indicador de depressão", "indicador de memória (zs)", "dimensão da protusão da fibra lombar", "grau de adesão da musculatura dos ombros", "limite de circulação dos membros", "grau de envelhecimento dos ligamentos", "coeficiente de oesteoclastos", "perda de cálcio", "grau de hiperplasia óssea", "grau de osteoporose", "densidade óssea", "calcificação coluna cervical", "calcificação coluna lombar", "coeficiente de hiperplasia óssea", "coeficiente de osteoporose", "coeficiente de reumatismo", "coeficiente de secreção de insulina", "coeficiente de açúcar no sangue", "coeficiente de açúcar na urina", "capacidade de reação fisica", "capacidade cerebral", "falta de água", "hipóxia", "ph", "bebida estimulante", "radiação eletromagnética", "tabaco/nicotina e outros", "resíduos tóxicos de pesticida", "cálcio", "ferro", "zinco", "selênio", "fósforo", "potássio", "magnésio", "cobre", "cobalto", "manganês", "iodo", "níquel", "flúor", "molibdênio", "vanádio", "estanho", "silício", "estrôncio", "boro", "estrogênio", "gonadotrofina", "prolactina", "progesterona", "coeficiente de vaginite", "coeficiente de inflamação pélvica", "coeficiente de anexite", "coeficiente de cervicite", "coeficiente de cisto nos ovarios", "índice dos radicais livres da pele", "índice de colágeno da pele", "índice de oleosidade da pele", "índice de imunidade da pele", "índice de hidratação da pele", "perda de hidratação da pele", "índice de dilatação dos vasos sanguíneos da pele", "índice de elasticidade da pele", "índice de melanina da pele", "índice de queratinócitos da pele", "índice de secreção da tireóide", "índice de secreção da paratireóide", "índice de secreção da glândula supra-renal", "índice de secreção da pituitária", "índice de secreção da glândula pineal", "índice de secreção do timo", "índice gonadal", "índice de linfonodo", "índice de imunidade das amígdalas", "índice da medula óssea", "índice do baço", "índice do timo", "índice de imunoglobulina", "índice de imunidade do trato respiratório", "índice de imunidade gastrointestinal", "índice de imunidade da mucosa", "coeficiente de fibrosidade da glândula mamária", "coeficiente de mastite aguda", "coeficiente de mastite crônica", "coeficiente de distúrbios endócrinos", "coeficiente de fibroadenoma", "vitamina a", "vitamina b1", "vitamina b2", "vitamina b3", "vitamina b6", "vitamina b12", "vitamina c", "vitamina d3", "vitamina e", "vitamina k", "lisina", "triptofano", "fenilalanina", "metionina", "treonina", "isoleucina", "leucina", "valina", "histidina", "arginina", "fosfatase alcalina óssea", "osteocalcina", "cartilagem grandes articulaçoes", "cartilagem pequenas articulações", "linha epifisária", "bolsas sob os olhos", "colágeno das rugas nos olhos", "pigmentação da pele (índice de olheiras)", "obstrução linfática", "afrouxamento e queda", "edema", "atividade das células dos olhos", "fadiga visual", "chumbo", "mercúrio", "cádmio", "crômio", "arsênico", "antimônio", "tálio", "alumínio", "índice de alergia a medicamentos", "índice de alergia álcool", "índice de alergia ao pólen", "índice de alergia antibioticos", "fibra química", "alergia a tintas e vernizes", "índice de alergia a poeira", "índice de alergia a fumos", "alergia a corante de tintas cabelo", "índice alergia de contato", "alergia a acessorios de metal", "índice alergia marisco", "índice alergia proteína do leite", "nicotinamida", "biotina", "ácido pantotênico", "ácido fólico", "coenzima q10", "glutationa", "coeficiente de metabolismo anormal de lipidos", "anormalidades tecido adiposo", "coeficiente de hiperinsulinemia", "coeficiente de anomalia hipotálamo núcleo", "coeficiente de conteúdo anormal de triglicerídeos", "olhos", "dentes", "cabelo e pele", "sistema endocrino", "circulação de sangue do coração e do cérebro", "estômago e intervalo intestinal", "sistema imunologico", "articulações", "tecido muscular", "metabolismo da gordura", "desintoxicação e metabolismo", "sistema reprodutivo", "sistema nervoso", "esqueleto", "coeficiente da função peristáltica do intestino grosso", "coeficiente de absorção do cólon", "coeficiente das bactérias intestinais (flora intestinal)", "coeficiente de pressão intraluminal", "tiroxina livre (t4)", "tiroglobulina", "os anticorpos antitireoglobulina", "triiodotironina (t3)", "ácido linoleico", "α-ácido linolênico", "γ-ácido linolênico", "ácido araquidônico", "estrogénio", "andrógeno", "progesterona(p)", "hormona luteinizante (lh)", "prolactina(prl)", "hormona estimuladora folícula (fsh)", "meridiano do pulmão tai yin da mão", "meridiano do intestino grosso yangming da mão", "meridiano do estômago yangming do pé", "meridiano baço/pancreas tai yn do pe", "meridiano do coração shao yin da mão", "meridiano do intestino delgado tai yang da mão", "meridiano da bexiga tai yang do pé", "meridiano dos rins shao yin do pé", "pericárdio", "triplo aquecedor shao yang da mão", "meridiano da vesícula biliar shao yang do pé", "meridiano do fígado jue yin do pé", "ren mai", "meridiano governador", "meridiano vital", "da mai", "índice de acidente vascular cerebral", "pulso (sv)", "resistência periférica do coração (trr)", "coeficiente da onda de pulso k", "saturação do oxigênio do sangue cerebrovascular (sa)", "volume do oxigênio do sangue cerebrovascular (caco2)", "pressão do oxigênio do sangue cerebrovascular (pao2)", "viscosidade do sangue", "colesterol total (tc)", "triglicerídeos (tg)", "lipoproteína de alta densidade (hdl-c)", "lipoproteína de baixa densidade (ldl-c)", "gordura neutra (mb)", "complexo imunológico circulatório (cic)", "hormona beta (folículo estimulante) fsh", "proteína de resposta", "fibrinogênio", "taxa de sedimentação", "índice imunitário de barreira tecidual", "índice de células imunitárias inatas", "índice de molécula imunitária inata", "índice imunitário celular", "índice de imunidade humoral", "vergonha", "culpa", "apatia", "dor", "medo", "desejo", "raiva", "orgulho", "coragem", "neutralidade", "vontade", "aceitação", "razão", "amor", "alegria", "paz", "iluminismo", "volume maré(vt)", "volume inspiratório (ti)", "capacidade residual funcional(frc)", "volume residual(rv)", "índice fosfolipídico", "índice esfingolípide", "índice de esfingomielilina", "índice de lecitina", "índice fosfolípide cerebral", "índice lipossômico", "índice de ácidos gordos saturados", "índice de ácidos gordos não saturados", "índice de ácidos gordos essenciais", "índice de triglicéridos"
-    ]
-    return any(term in name_lower for term in valid_terms)
+    return _VALID_TERMS_RE.search(name_lower) is not None
 
 def names_are_similar(a: str, b: str, threshold: float = 0.9) -> bool:
     return SequenceMatcher(None, normalize_name(a), normalize_name(b)).ratio() > threshold
@@ -49,63 +395,350 @@ def names_are_similar(a: str, b: str, threshold: float = 0.9) -> bool:
 def normalize_name(name: str) -> str:
     return re.sub(r'\s+', ' ', name.lower().replace("(", "").replace(")", "").strip())
 
+# Índice de deduplicação dos parâmetros extraídos: mesmo resultado que comparar
+# cada nome novo com todas as chaves via names_are_similar, mas o nome normalizado
+# é calculado uma vez por nome, só entram como candidatas as chaves com comprimento
+# compatível (ratio <= 2*min(la, lb)/(la+lb)) e cada chave reaproveita seu
+# SequenceMatcher, testando real_quick_ratio/quick_ratio antes do ratio exato.
+class ParameterIndex:
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        self.parameters: Dict[str, Dict[str, float]] = {}
+        self.seen = set()
+        self._order: Dict[str, int] = {}
+        self._matchers: Dict[str, SequenceMatcher] = {}
+        self._by_length: Dict[int, set] = {}
+        self._counter = 0
+
+    def _insert(self, name: str, norm: str) -> None:
+        self._counter += 1
+        self._order[name] = self._counter
+        self._matchers[name] = SequenceMatcher(None, "", norm)
+        self._by_length.setdefault(len(norm), set()).add(name)
+
+    def _remove(self, name: str) -> None:
+        norm = self._matchers.pop(name).b
+        del self._order[name]
+        self._by_length[len(norm)].discard(name)
+        del self.parameters[name]
+        self.seen.remove(norm)
+
+    def find_similar(self, norm: str) -> Optional[str]:
+        # Primeira chave (na ordem do dicionário) com ratio > threshold
+        t = self.threshold
+        size = len(norm)
+        low, high = int(size * t / (2 - t)), int(size * (2 - t) / t) + 1
+        candidates = [name for length in range(low, high + 1) for name in self._by_length.get(length, ())]
+        found, compared = None, 0
+        for existing in sorted(candidates, key=self._order.__getitem__):
+            compared += 1
+            matcher = self._matchers[existing]
+            matcher.set_seq1(norm)
+            if matcher.real_quick_ratio() > t and matcher.quick_ratio() > t and matcher.ratio() > t:
+                found = existing
+                break
+        metrics.count("comparacoes_dedup", compared)  # só as comparações feitas até o primeiro similar
+        return found
+
+    # Aplica a regra de mesclagem (mantém o nome mais longo); retorna False se a linha foi descartada como repetida
+    def add(self, name: str, min_val: float, max_val: float, val: float) -> bool:
+        norm_name = normalize_name(name)
+        existing = self.find_similar(norm_name)
+        if existing is not None:
+            if len(name) > len(existing):
+                self._remove(existing)
+            else:
+                name = existing
+        if norm_name in self.seen:
+            return False
+        self.seen.add(norm_name)
+        if min_val < max_val:
+            if name not in self.parameters:
+                self._insert(name, norm_name)
+            self.parameters[name] = {"min": min_val, "max": max_val, "valor": val}
+        return True
+
+# Configuração do OCR (fallback para páginas sem texto nativo); ajustável por variável de ambiente
+OCR_DPI = int(os.environ.get("MTC_OCR_DPI", "200"))
+OCR_WORKERS = int(os.environ.get("MTC_OCR_WORKERS", str(os.cpu_count() or 1)))
+
 # Função para OCR em uma página (fallback)
-def ocr_page(image: Image) -> str:
-    return pytesseract.image_to_string(image, lang='por')  # 'por' para português; ajuste se necessário
+def ocr_page(image: "Image.Image") -> str:
+    return _pytesseract().image_to_string(image, lang='por')  # 'por' para português; ajuste se necessário
 
-# Função principal de extração com OCR fallback
-def extract_parameters_from_pdf(pdf_path: str) -> Dict[str, Dict[str, float]]:
-    parameters = {}
-    seen = set()
-    buffer = ""
+def _contiguous_runs(page_numbers: List[int]) -> List[tuple]:
+    runs = []
+    for number in sorted(page_numbers):
+        if runs and number == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], number)
+        else:
+            runs.append((number, number))
+    return runs
+
+# OCR em lote: rasteriza as páginas (em tons de cinza) com uma chamada ao pdf2image por
+# sequência contínua de páginas e distribui o Tesseract num pool de processos.
+# Retorna {número da página: texto}.
+def ocr_pages(pdf_path: str, page_numbers: List[int], dpi: Optional[int] = None, workers: Optional[int] = None) -> Dict[int, str]:
+    dpi = dpi or OCR_DPI
+    workers = workers or OCR_WORKERS
+    numbers, images = [], []
+    from pdf2image import convert_from_path
+    with metrics.stage("rasterizacao"):
+        for first, last in _contiguous_runs(page_numbers):
+            batch = convert_from_path(pdf_path, dpi=dpi, grayscale=True, first_page=first, last_page=last)
+            numbers.extend(range(first, first + len(batch)))
+            images.extend(batch)
+    metrics.count("paginas_ocr", len(images))
+    with metrics.stage("tesseract"):
+        if workers > 1 and len(images) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(images))) as pool:
+                texts = list(pool.map(ocr_page, images))
+        else:
+            texts = [ocr_page(image) for image in images]
+    return dict(zip(numbers, texts))
+
+# Versão do parser: compõe a chave do cache de extrações; incremente ao mudar o resultado da extração
+PARSER_VERSION = "6"
+
+# Extrai os parâmetros de um PDF ou DOCX conforme a extensão do arquivo
+def extract_parameters(path: str, **kwargs) -> Dict[str, Dict[str, float]]:
+    if os.path.splitext(path)[1].lower() == ".docx":
+        return extract_parameters_from_docx(path, use_cache=kwargs.get("use_cache", True))
+    return extract_parameters_from_pdf(path, **kwargs)
+
+# Resultados ficam em cache pelo SHA-256 do arquivo (ver cache.py); variant distingue
+# extrações do mesmo arquivo com configurações que mudam o resultado
+def _cache_key(path: str, variant: str = "") -> str:
+    return f"{file_sha256(path)}:{PARSER_VERSION}" + (f":{variant}" if variant else "")
+
+def _cached_extraction(path: str, extractor, use_cache: bool, variant: str = "") -> Dict[str, Dict[str, float]]:
+    if not use_cache:
+        return extractor()
+    extraction_cache = get_cache()
+    key = _cache_key(path, variant)
+    parameters = extraction_cache.get(key)
+    if parameters is None:
+        metrics.count("cache_miss")
+        parameters = extractor()
+        extraction_cache.put(key, parameters)
+    else:
+        metrics.count("cache_hit")
+    return parameters
 
+# Função principal de extração com OCR fallback. O DPI do OCR entra na chave do cache: uma
+# extração feita com um DPI não é devolvida a quem pediu outro (para PDFs sem páginas
+# escaneadas o resultado é o mesmo, e a chave é só mais específica do que precisaria)
+def extract_parameters_from_pdf(pdf_path: str, ocr_dpi: Optional[int] = None, ocr_workers: Optional[int] = None,
+                                use_cache: bool = True) -> Dict[str, Dict[str, float]]:
+    return _cached_extraction(pdf_path, lambda: _extract_parameters_from_pdf(pdf_path, ocr_dpi, ocr_workers), use_cache,
+                              variant=f"dpi={ocr_dpi or OCR_DPI}")
+
+# Cada página com texto nativo vira linhas (nome, mín, máx, valor) pelas coordenadas das
+# palavras; só as páginas em que isso não encontra a tabela passam pelo parser de linhas,
+# e as páginas sem texto nativo pelo OCR
+def _extract_parameters_from_pdf(pdf_path: str, ocr_dpi: Optional[int], ocr_workers: Optional[int]) -> Dict[str, Dict[str, float]]:
+    import pdfplumber
+    pages: List[object] = []  # lista de linhas da tabela ou texto da página
     with pdfplumber.open(pdf_path) as pdf:
         for page in pdf.pages:
-            text = page.extract_text()
-            if not text:  # Fallback para OCR se texto nativo falhar
-                images = convert_from_path(pdf_path, first_page=page.page_number, last_page=page.page_number)
-                if images:
-                    text = ocr_page(images[0])
-            if not text:
-                continue
-            lines = text.split("\n")
-            for line in lines:
-                line = clean_text(line)
-                if not line or is_header_line(line):
-                    buffer = ""
-                    continue
+            with metrics.stage("pdfplumber"):
+                words = page.extract_words()
+            with metrics.stage("layout"):
+                rows = extract_table_rows(words) if words else []
+            if not rows and words:
+                with metrics.stage("pdfplumber"):
+                    rows = page.extract_text()
+            pages.append(rows or None)
+    metrics.count("paginas", len(pages))
+    missing = [number for number, page in enumerate(pages, start=1) if not page]
+    if missing:  # Fallback para OCR nas páginas em que o texto nativo falhou
+        for number, text in ocr_pages(pdf_path, missing, dpi=ocr_dpi, workers=ocr_workers).items():
+            pages[number - 1] = text
 
-                pattern = r"([A-Za-z\sKATEX_INLINE_OPEN/)]{10,80}?)\s*(\d+[.,]\d+)\s*-\s*(\d+[.,]\d+)\s*(\d+[.,]\d+)"
-                match = re.search(pattern, line)
-                if match:
-                    raw_name, min_str, max_str, val_str = match.groups()
-                    name = clean_text(buffer + " " + raw_name).strip()
-                    if is_valid_name(name):
-                        norm_name = normalize_name(name)
-                        for existing in list(parameters.keys()):
-                            if names_are_similar(name, existing):
-                                if len(name) > len(existing):
-                                    del parameters[existing]
-                                    seen.remove(normalize_name(existing))
-                                else:
-                                    name = existing
-                                break
-                        if norm_name in seen:
-                            continue
-                        seen.add(norm_name)
-                        min_val = float(min_str.replace(",", "."))
-                        max_val = float(max_str.replace(",", "."))
-                        val = float(val_str.replace(",", "."))
-                        if min_val < max_val:
-                            parameters[name] = {"min": min_val, "max": max_val, "valor": val}
-                    buffer = ""
-                else:
-                    if len(buffer + " " + line) < 50 and is_valid_name(line):
-                        buffer += " " + line
-                    else:
-                        buffer = ""
+    return _collect_parameters(pages)
 
-    return parameters
+# Junta os trechos (lista de linhas de tabela ou texto corrido), na ordem, num único índice
+def _collect_parameters(segments: List[object]) -> Dict[str, Dict[str, float]]:
+    index = ParameterIndex()
+    for segment in segments:
+        if isinstance(segment, list):
+            metrics.count("linhas_candidatas", len(segment))
+            with metrics.stage("is_valid_name"):
+                valid = [row for row in segment if is_valid_name(row[0])]
+            with metrics.stage("dedup"):
+                for row in valid:
+                    index.add(*row)
+        elif segment:
+            parse_texts([segment], index)
+    return index.parameters
+
+_NUMBER_RE = re.compile(r"\d+[.,]\d+")
+_RANGE_VALUE_RE = re.compile(r"(\d+[.,]\d+)\s*-\s*(\d+[.,]\d+)\s+(\d+[.,]\d+)")
+
+def _word_lines(words: List[dict], tolerance: float = 2.0) -> List[List[dict]]:
+    lines: List[List[dict]] = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if lines and word["top"] - lines[-1][0]["top"] <= tolerance:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w["x0"]) for line in lines]
+
+# Borda esquerda da coluna "Intervalo normal", localizada pelo cabeçalho da tabela: só conta
+# "Intervalo" seguido de "normal" na mesma linha, porque "intervalo" também aparece em nomes
+# de parâmetros ("estômago e intervalo intestinal"); sem cabeçalho, retorna None
+def _range_column(lines: List[List[dict]]) -> Optional[float]:
+    for line in lines:
+        for word, following in zip(line, line[1:]):
+            if word["text"].lower() == "intervalo" and following["text"].lower() == "normal":
+                return word["x0"]
+    return None
+
+# Posição da primeira palavra das colunas numéricas: pela coordenada x quando o cabeçalho
+# foi encontrado, senão pela primeira palavra a partir da qual a linha é "mín - máx valor"
+def _split_point(line: List[dict], boundary: Optional[float]) -> int:
+    for i, word in enumerate(line):
+        if boundary is not None:
+            if word["x0"] >= boundary - 1:
+                return i
+        elif _NUMBER_RE.match(word["text"]) and _RANGE_VALUE_RE.match(" ".join(w["text"] for w in line[i:])):
+            return i
+    return len(line)
+
+# Extração orientada ao layout: linhas com intervalo e valor à direita da coluna de nomes
+# são as âncoras; linhas que só têm texto na coluna de nomes (nomes quebrados na célula)
+# são anexadas à âncora verticalmente mais próxima, dentro de 1,5x a altura da fonte
+def extract_table_rows(words: List[dict]) -> List[tuple]:
+    lines = _word_lines(words)
+    boundary = _range_column(lines)
+    anchors, fragments = [], []
+    for line in lines:
+        top = line[0]["top"]
+        split = _split_point(line, boundary)
+        numbers = " ".join(w["text"] for w in line[split:])
+        match = _RANGE_VALUE_RE.match(numbers)
+        if not match and boundary is not None:
+            # Intervalo que começa um pouco à esquerda do cabeçalho: o mínimo cairia no
+            # nome e a linha seria descartada; refaz a divisão pelo primeiro número
+            split = _split_point(line, None)
+            numbers = " ".join(w["text"] for w in line[split:])
+            match = _RANGE_VALUE_RE.match(numbers)
+        name = " ".join(w["text"] for w in line[:split])
+        if match:
+            anchors.append((top, [(top, name)], match.groups()))
+        elif name and not numbers and not any(kw in name.lower() for kw in HEADER_KEYWORDS):
+            fragments.append((top, name))
+    if not anchors:
+        return []
+
+    max_gap = 1.5 * statistics.median(w["bottom"] - w["top"] for w in words)
+    tops = [anchor[0] for anchor in anchors]
+    for top, name in fragments:
+        position = bisect.bisect_left(tops, top)
+        # Em caso de empate, a linha pertence à âncora seguinte
+        nearest = min((i for i in (position - 1, position) if 0 <= i < len(tops)),
+                      key=lambda i: (abs(tops[i] - top), -i))
+        if abs(tops[nearest] - top) <= max_gap:
+            anchors[nearest][1].append((top, name))
+
+    rows = []
+    for _, parts, (min_str, max_str, val_str) in anchors:
+        name = clean_text(" ".join(part for _, part in sorted(parts) if part))
+        rows.append((name, float(min_str.replace(",", ".")), float(max_str.replace(",", ".")), float(val_str.replace(",", "."))))
+    return rows
+
+# Extração direta do DOCX: linhas de tabela no formato nome / intervalo / valor viram
+# parâmetros diretamente e o restante do documento segue, na ordem, para o mesmo parser de
+# linhas do PDF. O LibreOffice só entra como fallback explícito (ver converter.py), quando a
+# leitura nativa não encontra nenhum parâmetro.
+def extract_parameters_from_docx(docx_path: str, use_cache: bool = True) -> Dict[str, Dict[str, float]]:
+    return _cached_extraction(docx_path, lambda: _extract_parameters_from_docx(docx_path), use_cache)
+
+def _extract_parameters_from_docx(docx_path: str) -> Dict[str, Dict[str, float]]:
+    with metrics.stage("python-docx"):
+        from docx import Document
+        segments = docx_segments(Document(docx_path))
+    parameters = _collect_parameters(segments)
+    if parameters or not fallback_available():
+        return parameters
+    with tempfile.TemporaryDirectory(prefix="mtc_docx_") as output_dir:
+        with metrics.stage("libreoffice"):
+            pdf_path = get_converter().convert(docx_path, output_dir)
+        return _extract_parameters_from_pdf(pdf_path, None, None)
+
+# Linhas de tabela cuja primeira célula é o nome e as demais trazem "mín - máx valor" viram
+# linhas (nome, mín, máx, valor) diretamente; o restante (parágrafos e outras tabelas) segue
+# como texto para o parser de linhas, com as células de cada linha unidas
+def docx_segments(doc: "Document") -> List[object]:
+    from docx.table import Table
+    segments: List[object] = []
+
+    def append(item: object, kind: type) -> None:
+        if segments and isinstance(segments[-1], kind):
+            segments[-1] += item
+        else:
+            segments.append(item)
+
+    for block in doc.iter_inner_content():
+        if not isinstance(block, Table):
+            append(block.text + "\n", str)
+            continue
+        for row in block.rows:
+            cells, previous = [], None
+            for cell in row.cells:  # células mescladas se repetem em row.cells
+                if cell._tc is not previous:
+                    cells.append(cell.text.replace("\n", " ").strip())
+                    previous = cell._tc
+            # match, não fullmatch: colunas extras depois do valor (ex.: "Resultado do teste")
+            # não tiram a linha da tabela, como no caminho de layout do PDF
+            match = _RANGE_VALUE_RE.match(" ".join(cells[1:]).strip()) if len(cells) > 1 else None
+            if match:
+                min_str, max_str, val_str = match.groups()
+                append([(clean_text(cells[0]), float(min_str.replace(",", ".")), float(max_str.replace(",", ".")),
+                         float(val_str.replace(",", ".")))], list)
+            else:
+                append(" ".join(cells) + "\n", str)
+    return segments
+
+_LINE_RE = re.compile(r"([A-Za-z\s(/)]{10,80}?)\s*(\d+[.,]\d+)\s*-\s*(\d+[.,]\d+)\s*(\d+[.,]\d+)")
+
+# Parser de linhas (texto do OCR, DOCX e páginas sem tabela reconhecível): nome, intervalo
+# normal e valor medido; nomes quebrados em várias linhas são reunidos pelo buffer
+def parse_texts(texts: List[Optional[str]], index: Optional[ParameterIndex] = None) -> Dict[str, Dict[str, float]]:
+    index = index if index is not None else ParameterIndex()
+    with metrics.stage("parser_linhas"):
+        return _parse_lines([line for text in texts if text for line in text.split("\n")], index)
+
+def _parse_lines(lines: List[str], index: ParameterIndex) -> Dict[str, Dict[str, float]]:
+    buffer = ""
+    matches = 0
+    for line in lines:
+        line = clean_text(line)
+        if not line or is_header_line(line):
+            buffer = ""
+            continue
+
+        match = _LINE_RE.search(line)
+        if match:
+            matches += 1
+            raw_name, min_str, max_str, val_str = match.groups()
+            name = clean_text(buffer + " " + raw_name).strip()
+            if is_valid_name(name):
+                min_val = float(min_str.replace(",", "."))
+                max_val = float(max_str.replace(",", "."))
+                val = float(val_str.replace(",", "."))
+                if not index.add(name, min_val, max_val, val):
+                    continue
+            buffer = ""
+        else:
+            if len(buffer + " " + line) < 50 and is_valid_name(line):
+                buffer += " " + line
+            else:
+                buffer = ""
+
+    metrics.count("linhas_candidatas", len(lines))
+    metrics.count("matches_regex", matches)
+    return index.parameters
 
 # Validação (inalterada)
 def validate_parameters(parameters: Dict[str, Dict[str, float]]) -> List[Dict[str, any]]:
@@ -128,7 +761,8 @@ def validate_parameters(parameters: Dict[str, Dict[str, float]]) -> List[Dict[st
     return anomalies
 
 # Geração de relatório (inalterada)
-def generate_report(anomalies: List[Dict[str, any]], therapist: str, registry: str, output_path: str) -> None:
+def generate_report(anomalies: List[Dict[str, any]], therapist: str, registry: str, output_path: Union[str, IO[bytes]]) -> None:
+    from docx import Document
     doc = Document()
     doc.add_heading("Relatório de Anomalias", level=1)
     doc.add_paragraph(f"Terapeuta: {therapist}   Registro: {registry}")